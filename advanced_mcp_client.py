@@ -4,45 +4,284 @@ import json
 import asyncio
 import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Any
 from langchain_core.tools import Tool
+from mcp_client_core import manifest_cache as shared_manifest_cache
+from tool_validators import ValidationError
+from prompt_builder import prompt_sections
+
+# Responses worth retrying: overload (429/503) and gateway errors
+RETRY_STATUSES = (429, 502, 503, 504)
 
 class AdvancedMCPClient:
-    def __init__(self, base_url="http://localhost:5001"):
+    """
+    MCP client that keeps long-lived connection pools for both the sync
+    tool functions (requests) and the async batch path (aiohttp). Use it
+    as a context manager, or call close() / aclose(), to release them.
+    """
+    def __init__(self, base_url="http://localhost:5001", pool_size=10, keepalive=30,
+                 timeout=30, retries=3, backoff=0.3, manifest_cache=None):
         self.base_url = base_url
-        self.manifest = self._fetch_manifest()
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = self._create_session()
+        self._async_session = None
+        self._async_session_loop = None
+        self.manifest_cache = manifest_cache or shared_manifest_cache
         self.tools_cache = {}
 
-    def _fetch_manifest(self):
-        response = requests.get(f"{self.base_url}/manifest")
-        return response.json() if response.status_code == 200 else {"tools": []}
-
-    async def batch_invoke_tools(self, tool_requests):
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for req in tool_requests:
-                tool_name = req.get("tool")
-                params = req.get("params", {})
-                task = self._async_call_tool(session, tool_name, params)
-                tasks.append(task)
-            return await asyncio.gather(*tasks)
-
-    async def _async_call_tool(self, session, tool_name, params):
+    def _create_session(self):
+        session = requests.Session()
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUSES,
+            # Tool calls have no side effects, so POSTs are safe to retry
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _get_async_session(self):
+        # aiohttp sessions are bound to the event loop that created them
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_session_loop is not loop:
+            if self._async_session is not None and not self._async_session.closed:
+                # Its loop is gone, so the session can no longer be awaited
+                self._async_session.detach()
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive)
+            self._async_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._async_session_loop = loop
+        return self._async_session
+
+    def close(self):
+        self.session.close()
+        if self._async_session is not None and not self._async_session.closed:
+            loop = self._async_session_loop
+            if loop.is_running():
+                loop.create_task(self._async_session.close())
+            elif not loop.is_closed():
+                loop.run_until_complete(self._async_session.close())
+            else:
+                self._async_session.detach()
+        self._async_session = None
+
+    async def aclose(self):
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    @property
+    def manifest(self):
+        return self.manifest_cache.get(self.base_url, self.session, default={"tools": []})
+
+    @property
+    def tool_index(self):
+        return self.manifest_cache.index(self.base_url, self.session, default={"tools": []})
+
+    async def _async_post(self, path, payload):
+        """
+        POSTs through the pooled aiohttp session, retrying connection errors
+        and RETRY_STATUSES with exponential backoff (or the server's
+        Retry-After). Returns (status, parsed JSON or response text).
+        """
+        session = self._get_async_session()
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.post(f"{self.base_url}{path}", json=payload) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        retry_after = response.headers.get("Retry-After", "")
+                        delay = float(retry_after) if retry_after.isdigit() else self.backoff * 2 ** attempt
+                        await asyncio.sleep(delay)
+                        continue
+                    if response.status == 200:
+                        return response.status, await response.json()
+                    return response.status, await response.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def batch_invoke_tools(self, tool_requests, use_batch_endpoint=True,
+                                 max_concurrency=None, call_timeout=None, overall_timeout=None):
+        batch_endpoint = self.manifest.get("batch_endpoint")
+        if use_batch_endpoint and batch_endpoint:
+            return await self.bulk_invoke_tools(
+                tool_requests, batch_endpoint, max_concurrency, call_timeout, overall_timeout)
+
+        results = {}
+        async for index, result in self.iter_invoke_tools(
+                tool_requests, max_concurrency, call_timeout, overall_timeout):
+            results[index] = result
+        return [results[i] for i in range(len(results))]
+
+    async def iter_invoke_tools(self, tool_requests, max_concurrency=None,
+                                call_timeout=None, overall_timeout=None):
+        """
+        Yields (index, result) pairs as calls complete, with at most
+        max_concurrency calls in flight. tool_requests may be any iterable,
+        including a generator, and is only consumed as slots free up.
+
+        A call that exceeds call_timeout, or is still pending when
+        overall_timeout runs out, yields an error result; every request
+        index gets exactly one result. Closing the iterator early cancels
+        the outstanding calls.
+        """
+        max_concurrency = max_concurrency or self.pool_size
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + overall_timeout if overall_timeout else None
+        requests_iter = enumerate(tool_requests)
+        pending = {}
+
+        def start_next():
+            for index, req in requests_iter:
+                call = self._async_call_tool(req.get("tool"), req.get("params", {}))
+                if call_timeout:
+                    call = asyncio.wait_for(call, call_timeout)
+                pending[asyncio.ensure_future(call)] = index
+                return True
+            return False
+
         try:
-            async with session.post(f"{self.base_url}/tools/{tool_name}", json=params) as response:
-                if response.status == 200:
-                    return await response.json()
+            while len(pending) < max_concurrency and start_next():
+                pass
+            while pending:
+                timeout = max(deadline - loop.time(), 0) if deadline else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except asyncio.TimeoutError:
+                        result = {"status": "error", "message": f"Timed out after {call_timeout}s"}
+                    yield index, result
+                    if len(pending) < max_concurrency:
+                        start_next()
+
+            # Overall deadline reached: fail whatever has not completed
+            timed_out = {"status": "error", "message": f"Batch deadline of {overall_timeout}s exceeded"}
+            for task, index in list(pending.items()):
+                task.cancel()
+                del pending[task]
+                yield index, dict(timed_out)
+            for index, _ in requests_iter:
+                yield index, dict(timed_out)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def bulk_invoke_tools(self, tool_requests, batch_endpoint=None, max_concurrency=None,
+                                call_timeout=None, overall_timeout=None):
+        """
+        Runs the calls through the server's /tools/batch endpoint, one POST
+        per max_calls page, and returns one result per call, in order.
+
+        call_timeout bounds each page's round trip; pages still queued or in
+        flight when overall_timeout runs out fail with an error result.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + overall_timeout if overall_timeout else None
+        batch_endpoint = batch_endpoint or self.manifest.get("batch_endpoint") or {}
+        path = batch_endpoint.get("path", "/tools/batch")
+        # Invalid calls fail locally; only valid ones go to the server
+        index = self.tool_index
+        results = []
+        calls = []
+        for req in tool_requests:
+            try:
+                params = index.validate(req.get("tool"), req.get("params", {}))
+                calls.append((len(results), {"tool": req.get("tool"), "params": params}))
+                results.append(None)
+            except ValidationError as e:
+                results.append({"status": "error", "message": str(e)})
+        page_size = batch_endpoint.get("max_calls") or len(calls) or 1
+        pages = [calls[i:i + page_size] for i in range(0, len(calls), page_size)]
+
+        semaphore = asyncio.Semaphore(max_concurrency or self.pool_size)
+
+        async def call_page(page):
+            async with semaphore:
+                remaining = deadline - loop.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    error = {"status": "error", "message": f"Batch deadline of {overall_timeout}s exceeded"}
+                    page_results = [dict(error) for _ in page]
                 else:
-                    return {"status": "error", "message": f"Error {response.status}: {await response.text()}"}
+                    timeouts = [t for t in (call_timeout, remaining) if t is not None]
+                    try:
+                        page_results = await asyncio.wait_for(
+                            self._async_call_batch(path, [call for _, call in page]),
+                            min(timeouts) if timeouts else None
+                        )
+                    except asyncio.TimeoutError:
+                        if call_timeout and (remaining is None or call_timeout < remaining):
+                            message = f"Timed out after {call_timeout}s"
+                        else:
+                            message = f"Batch deadline of {overall_timeout}s exceeded"
+                        page_results = [{"status": "error", "message": message} for _ in page]
+            for (i, _), result in zip(page, page_results):
+                results[i] = result
+
+        await asyncio.gather(*[call_page(page) for page in pages])
+        return results
+
+    async def _async_call_batch(self, path, calls):
+        try:
+            status, body = await self._async_post(path, {"calls": calls})
+            if status == 200:
+                return body["results"]
+            error = {"status": "error", "message": f"Error {status}: {body}"}
+        except Exception as e:
+            error = {"status": "error", "message": str(e)}
+        return [dict(error) for _ in calls]
+
+    async def _async_call_tool(self, tool_name, params):
+        try:
+            params = self.tool_index.validate(tool_name, params)
+        except ValidationError as e:
+            return {"status": "error", "message": str(e)}
+        try:
+            status, body = await self._async_post(f"/tools/{tool_name}", params)
+            if status == 200:
+                return body
+            else:
+                return {"status": "error", "message": f"Error {status}: {body}"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
     def get_tools(self) -> List[Tool]:
         tools = []
-        for mcp_tool in self.manifest.get("tools", []):
-            tool_name = mcp_tool["name"]
-            tool_desc = mcp_tool["description"]
-            input_schema = mcp_tool.get("input_schema", {})
+        index = self.tool_index
+        sections = prompt_sections(index)
+        for tool_name in index.names:
+            tool_desc = index.tools[tool_name]["description"]
+            input_schema = index.schemas[tool_name]
             self.tools_cache[tool_name] = {
                 "schema": input_schema,
                 "description": tool_desc
@@ -55,50 +294,36 @@ class AdvancedMCPClient:
                             try:
                                 params = json.loads(tool_input)
                             except json.JSONDecodeError:
-                                first_required = self.tools_cache[tool_name]["schema"].get("required", [])
-                                if first_required:
-                                    params = {first_required[0]: tool_input}
-                                else:
-                                    props = self.tools_cache[tool_name]["schema"].get("properties", {})
-                                    if props:
-                                        first_prop = list(props.keys())[0]
-                                        params = {first_prop: tool_input}
-                                    else:
-                                        params = {"query": tool_input}
+                                params = {self.tool_index.default_param(tool_name): tool_input}
                         else:
                             params = tool_input
-                        response = requests.post(f"{self.base_url}/tools/{tool_name}", json=params)
+                        params = self.tool_index.validate(tool_name, params)
+                        response = self.session.post(
+                            f"{self.base_url}/tools/{tool_name}", json=params, timeout=self.timeout
+                        )
                         if response.status_code == 200:
                             result = response.json()
                             return json.dumps(result, indent=2)
                         else:
                             return f"Error: {response.status_code} - {response.text}"
+                    except ValidationError as e:
+                        return f"Invalid arguments for tool {tool_name}: {str(e)}"
                     except Exception as e:
                         return f"Error calling tool {tool_name}: {str(e)}"
                 return tool_func
 
-            arg_schema = ""
-            if input_schema.get("properties"):
-                arg_schema = "Arguments (in JSON format):\n"
-                for prop_name, prop_details in input_schema["properties"].items():
-                    required = "REQUIRED" if prop_name in input_schema.get("required", []) else "optional"
-                    prop_type = prop_details.get("type", "any")
-                    description = prop_details.get("description", "")
-                    default = f", default: {prop_details['default']}" if "default" in prop_details else ""
-                    arg_schema += f"- {prop_name} ({prop_type}, {required}{default}): {description}\n"
-
-            enhanced_description = f"{tool_desc}\n\n{arg_schema}"
+            enhanced_description = sections.tool_docs[tool_name]
             tool = Tool(name=tool_name, description=enhanced_description, func=create_tool_func())
             tools.append(tool)
         return tools
 
 async def run_batch_example():
-    client = AdvancedMCPClient()
-    results = await client.batch_invoke_tools([
-        {"tool": "math", "params": {"operation": "add", "a": 5, "b": 7}},
-        {"tool": "weather", "params": {"location": "tokyo"}},
-        {"tool": "datetime", "params": {"format": "%Y-%m-%d"}}
-    ])
+    async with AdvancedMCPClient() as client:
+        results = await client.batch_invoke_tools([
+            {"tool": "math", "params": {"operation": "add", "a": 5, "b": 7}},
+            {"tool": "weather", "params": {"location": "tokyo"}},
+            {"tool": "datetime", "params": {"format": "%Y-%m-%d"}}
+        ])
     print("Batch results:")
     for result in results:
         print(json.dumps(result, indent=2))
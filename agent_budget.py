@@ -0,0 +1,103 @@
+"""
+Per-turn budgets for the ReAct agent.
+
+BudgetedExecutor wraps an AgentExecutor with a step cap (max_iterations)
+and a wall-clock cap (max_execution_time), and memoizes tool results
+within a turn, so an agent that repeats an identical call gets the earlier
+result instead of another round trip. When a budget runs out, the answer
+is built from the tool results gathered so far rather than the executor's
+generic stop message, without spending another LLM call.
+
+max_execution_time is only checked between steps, so a single LLM or tool
+call must be bounded by its own request timeout (see langchain_app.py).
+"""
+import json
+
+from langchain.agents import AgentExecutor
+from langchain_core.tools import Tool
+
+# Prefix of the output AgentExecutor returns when early_stopping_method="force" hits a limit
+STOPPED_PREFIX = "Agent stopped due to"
+
+NO_RESULTS_MESSAGE = (
+    "Sorry, I couldn't finish working on that within the time and step budget. "
+    "Try asking a simpler or more specific question."
+)
+
+
+def input_key(tool_input):
+    """Treats JSON inputs that differ only in formatting or key order as the same call."""
+    if isinstance(tool_input, str):
+        try:
+            tool_input = json.loads(tool_input)
+        except ValueError:
+            return tool_input.strip()
+    return json.dumps(tool_input, sort_keys=True, default=str)
+
+
+class TurnMemo:
+    """Tool results for the current turn, keyed by tool name and input."""
+
+    def __init__(self):
+        self.results = {}
+        self.hits = 0
+
+    def clear(self):
+        self.results.clear()
+        self.hits = 0
+
+
+def memoize_tool(tool, memo):
+    def run(tool_input):
+        key = (tool.name, input_key(tool_input))
+        if key in memo.results:
+            memo.hits += 1
+        else:
+            memo.results[key] = tool.func(tool_input)
+        return memo.results[key]
+    return Tool(name=tool.name, description=tool.description, func=run)
+
+
+def partial_answer(intermediate_steps):
+    """The distinct tool results gathered before the budget ran out."""
+    found = {}
+    for action, observation in intermediate_steps:
+        # Parsing-error steps carry no result
+        if action.tool == "_Exception":
+            continue
+        found.setdefault((action.tool, input_key(action.tool_input)), (action, observation))
+    if not found:
+        return NO_RESULTS_MESSAGE
+    lines = ["I couldn't finish within the time and step budget. Here is what I found so far:"]
+    for action, observation in found.values():
+        lines.append(f"- {action.tool} ({action.tool_input}): {observation}")
+    return "\n".join(lines)
+
+
+class BudgetedExecutor:
+    """
+    One pooled agent: used by one request at a time, so the memo only ever
+    holds the current turn's results.
+    """
+
+    def __init__(self, agent, tools, max_iterations=6, max_execution_time=30.0, **executor_kwargs):
+        self.memo = TurnMemo()
+        self.executor = AgentExecutor(
+            agent=agent,
+            tools=[memoize_tool(tool, self.memo) for tool in tools],
+            max_iterations=max_iterations,
+            max_execution_time=max_execution_time,
+            early_stopping_method="force",
+            return_intermediate_steps=True,
+            **executor_kwargs
+        )
+
+    def invoke(self, inputs, config=None):
+        self.memo.clear()
+        response = self.executor.invoke(inputs, config=config)
+        steps = response.get("intermediate_steps", [])
+        response["memoized_calls"] = self.memo.hits
+        response["stopped_early"] = str(response.get("output", "")).startswith(STOPPED_PREFIX)
+        if response["stopped_early"]:
+            response["output"] = partial_answer(steps)
+        return response
@@ -0,0 +1,132 @@
+"""
+Bounded pool of pre-built agent executors.
+
+Executors are built once, from parts shared by all of them (the agent
+runnable with its prompt partial, and the tool list), and handed out one
+per request. Concurrent chats never share an executor, and the number of
+agent turns in flight is capped by the pool size. A request that cannot
+get an executor within the checkout timeout gets PoolExhausted, with a
+Retry-After estimated from recent turn latency. rebuild() swaps in
+executors built from new parts, e.g. after the tool manifest changes.
+"""
+import math
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolExhausted(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AgentPool:
+    def __init__(self, build, size=4, checkout_timeout=30.0):
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self._build = build
+        self.generation = 0
+        # Generation each executor was built in, by id
+        self._generations = {}
+        # LIFO, so the most recently used executor is handed out next
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(self._new_executor(build, 0))
+        self._lock = threading.Lock()
+        self._checked_out = {}
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = 0.0
+        self.avg_hold = 0.0
+        self._started = time.monotonic()
+
+    def _new_executor(self, build, generation):
+        executor = build()
+        self._generations[id(executor)] = generation
+        return executor
+
+    def rebuild(self, build):
+        """
+        Replaces every executor with one from build. Idle executors are
+        swapped now; checked-out ones when they are released.
+        """
+        with self._lock:
+            self._build = build
+            self.generation += 1
+            generation = self.generation
+        stale = []
+        while True:
+            try:
+                stale.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for executor in stale:
+            self._generations.pop(id(executor), None)
+            self._idle.put(self._new_executor(build, generation))
+
+    def retry_after(self):
+        backlog = (self.waiting + 1) / self.size
+        return max(1, math.ceil(backlog * self.avg_hold))
+
+    def acquire(self, timeout=None):
+        """Returns an idle executor, waiting up to the checkout timeout."""
+        requested = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        try:
+            executor = self._idle.get(timeout=self.checkout_timeout if timeout is None else timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolExhausted("All agent executors are busy", self.retry_after())
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        acquired = time.perf_counter()
+        with self._lock:
+            self._checked_out[id(executor)] = acquired
+            self.peak_in_use = max(self.peak_in_use, len(self._checked_out))
+            self.checkouts += 1
+            self.wait_seconds += acquired - requested
+        return executor
+
+    def release(self, executor):
+        with self._lock:
+            held = time.perf_counter() - self._checked_out.pop(id(executor))
+            self.busy_seconds += held
+            # Exponentially weighted moving average of turn latency
+            self.avg_hold = held if not self.avg_hold else 0.8 * self.avg_hold + 0.2 * held
+            build, generation = self._build, self.generation
+        if self._generations.get(id(executor)) != generation:
+            self._generations.pop(id(executor), None)
+            executor = self._new_executor(build, generation)
+        self._idle.put(executor)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        executor = self.acquire(timeout)
+        try:
+            yield executor
+        finally:
+            self.release(executor)
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                "size": self.size,
+                "in_use": len(self._checked_out),
+                "peak_in_use": self.peak_in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_seconds": self.wait_seconds / self.checkouts if self.checkouts else 0.0,
+                "avg_hold_seconds": self.avg_hold,
+                "utilization": self.busy_seconds / (self.size * elapsed) if elapsed else 0.0,
+            }
@@ -1,11 +1,19 @@
 import os
 import json
+import asyncio
+import atexit
+import queue
+import threading
 from pathlib import Path
+import time
 import traceback
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 from advanced_mcp_client import AdvancedMCPClient
+from decision_cache import DecisionCache, tools_fingerprint
+from fast_router import FastRouter
+from prompt_builder import prompt_sections
 
 app = Flask(__name__)
 
@@ -17,9 +25,53 @@ llm = ChatOpenAI(model="gpt-4", temperature=0)
 
 # MCP tools
 mcp_client = AdvancedMCPClient()
+tools_index = mcp_client.tool_index
 tools = mcp_client.get_tools()
 tool_funcs = {tool.name: tool.func for tool in tools}
 
+# Tool-selection decisions cached per normalized message and tool list.
+# Set DECISION_CACHE_PATH to keep them across restarts.
+decision_cache = DecisionCache(
+    maxsize=int(os.environ.get("DECISION_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("DECISION_CACHE_TTL", "86400")),
+    path=os.environ.get("DECISION_CACHE_PATH")
+)
+TOOLS_FINGERPRINT = tools_fingerprint(tools)
+
+# Messages like "add 5 and 7" or "weather in london" are routed by local
+# rules built from the manifest; only ambiguous ones reach the LLM.
+fast_router = FastRouter(tools_index)
+
+# The manifest is revalidated in the background; when it changes, the tool
+# list, fingerprint and fast router are rebuilt before the next request.
+tools_lock = threading.Lock()
+
+@app.before_request
+def refresh_tools():
+    global tools_index, tools, tool_funcs, TOOLS_FINGERPRINT, fast_router
+    if mcp_client.tool_index is tools_index:
+        return
+    with tools_lock:
+        index = mcp_client.tool_index
+        if index is tools_index:
+            return
+        tools = mcp_client.get_tools()
+        tool_funcs = {tool.name: tool.func for tool in tools}
+        TOOLS_FINGERPRINT = tools_fingerprint(tools)
+        fast_router = FastRouter(index)
+        tools_index = index
+
+# Tool calls from a chat turn run on one long-lived event loop, so the
+# client's aiohttp connection pool is reused across requests.
+MAX_TOOL_CALLS = int(os.environ.get("CHAT_MAX_TOOL_CALLS", "8"))
+TOOL_CALL_TIMEOUT = float(os.environ.get("CHAT_TOOL_CALL_TIMEOUT", "30"))
+tool_loop = asyncio.new_event_loop()
+threading.Thread(target=tool_loop.run_forever, name="tool-calls", daemon=True).start()
+atexit.register(lambda: asyncio.run_coroutine_threadsafe(mcp_client.aclose(), tool_loop).result(5))
+
+# Requests and total seconds per routing path: fast, cache or llm
+routing_stats = {path: {"requests": 0, "seconds": 0.0} for path in ("fast", "cache", "llm")}
+
 @app.route('/')
 def index():
     """
@@ -27,53 +79,205 @@ def index():
     """
     return render_template('index.html', tools=tools)
 
+def selection_prompt_prefix():
+    """The static part of the tool-selection prompt, rendered once per manifest version."""
+    return prompt_sections(mcp_client.tool_index).cached("tool_selection", lambda sections: (
+        "You have access to the following tools:\n" +
+        sections.tool_list +
+        "\n\nBased on the user's question, respond ONLY with a JSON object like:\n" +
+        '{ "calls": [ { "tool": "tool_name", "params": { "key": "value" } } ] }\n' +
+        "Use one call per independent part of the question.\n\n"
+    ))
+
+def selection_calls(parsed):
+    """
+    Normalizes a tool selection to a list of {tool, params} calls. Accepts
+    {"calls": [...]}, a bare list, or a single {"tool", "params"} object, and
+    drops duplicate calls.
+    """
+    if isinstance(parsed, list):
+        calls = parsed
+    elif isinstance(parsed, dict) and "calls" in parsed:
+        calls = parsed.get("calls") or []
+    else:
+        calls = [parsed]
+
+    unique = {}
+    for call in calls[:MAX_TOOL_CALLS]:
+        if not isinstance(call, dict):
+            continue
+        call = {"tool": call.get("tool"), "params": call.get("params") or {}}
+        unique.setdefault(json.dumps(call, sort_keys=True, default=str), call)
+    return list(unique.values())
+
+def run_tool_calls(calls):
+    future = asyncio.run_coroutine_threadsafe(
+        mcp_client.batch_invoke_tools(calls, call_timeout=TOOL_CALL_TIMEOUT), tool_loop
+    )
+    return future.result()
+
+def merge_results(calls, results):
+    """One pretty-printed result, or one labelled section per call."""
+    if len(results) == 1:
+        return json.dumps(results[0], indent=2)
+    return "\n\n".join(
+        f"{call['tool']}:\n{json.dumps(result, indent=2)}" for call, result in zip(calls, results)
+    )
+
+def record_path(path, started):
+    routing_stats[path]["requests"] += 1
+    routing_stats[path]["seconds"] += time.perf_counter() - started
+
+def quick_selection(user_input):
+    """Local rules first, then the decision cache. Returns (path, selection) or (None, None)."""
+    parsed = fast_router.route(user_input)
+    if parsed is not None:
+        return "fast", parsed
+    parsed = decision_cache.get(user_input, TOOLS_FINGERPRINT)
+    if parsed is not None:
+        return "cache", parsed
+    return None, None
+
+def selection_prompt(user_input):
+    return selection_prompt_prefix() + f"User's question: {user_input}"
+
+def remember_selection(user_input, parsed):
+    # Only real tool choices are worth replaying
+    calls = selection_calls(parsed)
+    if calls and all(call["tool"] in tool_funcs for call in calls):
+        decision_cache.set(user_input, TOOLS_FINGERPRINT, {"calls": calls})
+
+def fallback_message(calls):
+    first = calls[0]["params"] if calls else {}
+    return (first.get("message") if isinstance(first, dict) else None) or \
+        "Sorry, I couldn't understand your request. Try asking a specific question!"
+
+def unknown_tool(call):
+    return {"status": "error", "message": f"Unknown tool: {call['tool']}"}
+
+def iter_tool_calls(calls):
+    """Yields (index, result) pairs as the calls complete, in completion order."""
+    completed = queue.Queue()
+
+    async def produce():
+        try:
+            async for item in mcp_client.iter_invoke_tools(calls, call_timeout=TOOL_CALL_TIMEOUT):
+                completed.put(item)
+        finally:
+            completed.put(None)
+
+    asyncio.run_coroutine_threadsafe(produce(), tool_loop)
+    yield from iter(completed.get, None)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """
     Handles chat requests.  It receives a user message, uses the LLM to select
-    an appropriate tool, calls the tool, and returns the result.
+    one or more tool calls, runs them concurrently, and returns the merged result.
     """
     data = request.json
     user_input = data.get('message', '')
 
+    started = time.perf_counter()
     try:
         print(f"User: {user_input}")
 
-        # Ask GPT to pick a tool
-        tool_selection_prompt = (
-            "You have access to the following tools:\n" +
-            "\n".join([f"- {t.name}: {t.description}" for t in tools]) +
-            "\n\nBased on the user's question, respond ONLY with a JSON object like:\n" +
-            '{ "tool": "tool_name", "params": { "key": "value" } }\n\n' +
-            f"User's question: {user_input}"
-        )
+        path, parsed = quick_selection(user_input)
+        if parsed is not None:
+            print(f"Tool selection ({path}):", parsed)
+        else:
+            path = "llm"
+            # Ask GPT to pick the tool calls
+            result = llm.invoke([HumanMessage(content=selection_prompt(user_input))])
+            print("LLM Response:", result.content)
 
-        result = llm.invoke([HumanMessage(content=tool_selection_prompt)])
-        print("LLM Response:", result.content)
+            parsed = json.loads(result.content)
+            remember_selection(user_input, parsed)
 
-        parsed = json.loads(result.content)
-        tool_name = parsed.get("tool")
-        params = parsed.get("params", {})
+        calls = selection_calls(parsed)
+        known = [call for call in calls if call["tool"] in tool_funcs]
 
-        if tool_name not in tool_funcs:
-            fallback_message = parsed.get("params", {}).get("message") or \
-                            "Sorry, I couldn't understand your request. Try asking a specific question!"
-            return jsonify({"response": fallback_message}), 200
+        if not known:
+            record_path(path, started)
+            return jsonify({"response": fallback_message(calls), "path": path}), 200
 
-        tool_result = tool_funcs[tool_name](params)
+        # Independent calls run concurrently, in one batch where the server has one
+        known_results = iter(run_tool_calls(known))
+        results = [
+            next(known_results) if call["tool"] in tool_funcs else unknown_tool(call)
+            for call in calls
+        ]
 
-        try:
-            result_data = json.loads(tool_result)
-            pretty_result = json.dumps(result_data, indent=2)
-        except:
-            pretty_result = tool_result
-
-        return jsonify({"response": pretty_result})
+        record_path(path, started)
+        return jsonify({
+            "response": merge_results(calls, results),
+            "calls": [dict(call, result=result) for call, result in zip(calls, results)],
+            "path": path
+        })
 
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streaming variant of /api/chat. Sends server-sent events as the work
+    happens: "token" (LLM output), "tool_selected", "tool_started",
+    "partial" (one per finished call), then "final" or "error".
+    """
+    data = request.json
+    user_input = data.get('message', '')
+
+    def generate():
+        started = time.perf_counter()
+        try:
+            path, parsed = quick_selection(user_input)
+            if parsed is None:
+                path = "llm"
+                content = ""
+                for chunk in llm.stream([HumanMessage(content=selection_prompt(user_input))]):
+                    content += chunk.content
+                    yield sse_event("token", {"text": chunk.content})
+                parsed = json.loads(content)
+                remember_selection(user_input, parsed)
+
+            calls = selection_calls(parsed)
+            yield sse_event("tool_selected", {"path": path, "calls": calls})
+
+            known = [i for i, call in enumerate(calls) if call["tool"] in tool_funcs]
+            if not known:
+                record_path(path, started)
+                yield sse_event("final", {"response": fallback_message(calls), "path": path})
+                return
+
+            results = [unknown_tool(call) for call in calls]
+            for i in known:
+                yield sse_event("tool_started", {"index": i, **calls[i]})
+            for position, result in iter_tool_calls([calls[i] for i in known]):
+                i = known[position]
+                results[i] = result
+                yield sse_event("partial", {"index": i, "tool": calls[i]["tool"], "result": result})
+
+            record_path(path, started)
+            yield sse_event("final", {
+                "response": merge_results(calls, results),
+                "calls": [dict(call, result=result) for call, result in zip(calls, results)],
+                "path": path
+            })
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event("error", {"message": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/tools', methods=['GET'])
 def get_tools():
     """
@@ -84,6 +288,36 @@ def get_tools():
         for tool in tools
     ])
 
+@app.route('/api/prompt/stats', methods=['GET'])
+def prompt_stats():
+    """
+    Returns token counts for the tool sections of the prompt, so prompt size
+    can be tracked as tools are added.
+    """
+    selection_prompt_prefix()
+    return jsonify(prompt_sections(mcp_client.tool_index).stats())
+
+@app.route('/api/routing/stats', methods=['GET'])
+def routing_stats_view():
+    """
+    Returns how many requests took each routing path (fast rules, decision
+    cache or LLM) and their average latency.
+    """
+    return jsonify({
+        "paths": {
+            path: dict(stats, avg_seconds=stats["seconds"] / stats["requests"] if stats["requests"] else 0.0)
+            for path, stats in routing_stats.items()
+        },
+        "fast_router": fast_router.stats()
+    })
+
+@app.route('/api/decision_cache/stats', methods=['GET'])
+def decision_cache_stats():
+    """
+    Returns hit/miss/eviction counters of the tool-selection cache.
+    """
+    return jsonify(decision_cache.stats())
+
 if __name__ == '__main__':
     """
     Main entry point for the Flask application.  It ensures the 'templates'
@@ -112,6 +346,9 @@ if __name__ == '__main__':
         #send-button { padding: 8px 15px; }
         .user-message { text-align: right; margin: 5px; padding: 8px; background-color: #e3f2fd; border-radius: 8px; }
         .bot-message { text-align: left; margin: 5px; padding: 8px; background-color: #f1f1f1; border-radius: 8px; }
+        .status { color: #666; font-size: 0.9em; }
+        .status:empty { display: none; }
+        .content { white-space: pre-wrap; }
         .tools-section { margin-top: 20px; }
         .tool-card { border: 1px solid #ddd; padding: 10px; margin-bottom: 10px; border-radius: 5px; }
     </style>
@@ -136,6 +373,10 @@ if __name__ == '__main__':
             const sendButton = document.getElementById('send-button');
             const toolsList = document.getElementById('tools-list');
 
+            // One conversation per browser tab
+            const sessionId = sessionStorage.getItem('mcp-session-id') || crypto.randomUUID();
+            sessionStorage.setItem('mcp-session-id', sessionId);
+
             // Fetch the list of tools from the server
             fetch('/api/tools')
                 .then(response => response.json())
@@ -149,38 +390,100 @@ if __name__ == '__main__':
                     });
                 });
 
-            // Function to send a message to the server
+            // Pretty-print objects as JSON, show anything else as text
+            function formatResult(value) {
+                return typeof value === 'object' ? JSON.stringify(value, null, 2) : String(value);
+            }
+
+            // Function to send a message to the server and render its streamed events
             function sendMessage() {
-                const message = messageInput.value.trim(); // Get the message from the input
-                if (!message) return; // If the message is empty, do nothing
+                const message = messageInput.value.trim();
+                if (!message) return;
 
-                // Create a div for the user's message
                 const userMessageDiv = document.createElement('div');
-                userMessageDiv.className = 'user-message'; // Assign the user-message class
-                userMessageDiv.textContent = message; // Set the text content
-                chatContainer.appendChild(userMessageDiv); // Append to the chat container
-                chatContainer.scrollTop = chatContainer.scrollHeight; // Scroll to the bottom
-                messageInput.value = ''; // Clear the input field
-
-                // Send the message to the server's /api/chat endpoint
-                fetch('/api/chat', {
-                    method: 'POST', // Use the POST method
-                    headers: { 'Content-Type': 'application/json' }, // Set the content type
-                    body: JSON.stringify({ message }) // Convert the message to JSON
+                userMessageDiv.className = 'user-message';
+                userMessageDiv.textContent = message;
+                chatContainer.appendChild(userMessageDiv);
+                chatContainer.scrollTop = chatContainer.scrollHeight;
+                messageInput.value = '';
+
+                // The bot's message: a status line plus the streamed content
+                const botMessageDiv = document.createElement('div');
+                botMessageDiv.className = 'bot-message';
+                const statusDiv = document.createElement('div');
+                statusDiv.className = 'status';
+                statusDiv.textContent = 'Thinking…';
+                const contentDiv = document.createElement('div');
+                contentDiv.className = 'content';
+                botMessageDiv.append(statusDiv, contentDiv);
+                chatContainer.appendChild(botMessageDiv);
+
+                // One handler per server-sent event type
+                const running = [];
+                let finished = 0;
+                const handlers = {
+                    token: data => { contentDiv.textContent += data.text; },
+                    tool_selected: data => {
+                        statusDiv.textContent = 'Selected: ' + data.calls.map(call => call.tool).join(', ');
+                        contentDiv.textContent = '';
+                    },
+                    tool_started: data => {
+                        running.push(data.tool);
+                        statusDiv.textContent = `Running ${running.join(', ')} (${finished}/${running.length} done)`;
+                    },
+                    partial: data => {
+                        finished += 1;
+                        statusDiv.textContent = `Running ${running.join(', ')} (${finished}/${running.length} done)`;
+                        contentDiv.textContent += `${data.tool}:\\n${formatResult(data.result)}\\n\\n`;
+                    },
+                    final: data => {
+                        statusDiv.textContent = '';
+                        contentDiv.textContent = formatResult(data.response || '[No response]');
+                    },
+                    error: data => {
+                        statusDiv.textContent = '';
+                        contentDiv.textContent = 'Error: ' + data.message;
+                    }
+                };
+
+                // EventSource can't POST, so the event stream is read from fetch
+                fetch('/api/chat/stream', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ message, session_id: sessionId })
                 })
-                .then(response => response.json()) // Parse the JSON response
-                .then(data => {
-                    // Create a div for the bot's message
-                    const botMessageDiv = document.createElement('div');
-                    botMessageDiv.className = 'bot-message'; // Assign the bot-message class
-                    // Set the text content of the bot's message.  Handle both string
-                    // and object responses.  If it's an object, pretty-print it as JSON.
-                    botMessageDiv.textContent = typeof data.response === 'object'
-                        ? JSON.stringify(data.response, null, 2) // Pretty print JSON
-                        : data.response || '[No response]'; // Default text
-                    chatContainer.appendChild(botMessageDiv); // Append to the chat container
-                    chatContainer.scrollTop = chatContainer.scrollHeight; // Scroll to bottom
-                });
+                .then(async response => {
+                    // Errors such as a busy agent pool (503) come back as plain JSON
+                    const type = response.headers.get('Content-Type') || '';
+                    if (!response.ok || !type.startsWith('text/event-stream')) {
+                        const body = await response.json().catch(() => ({}));
+                        const retryAfter = response.headers.get('Retry-After');
+                        let message = body.error || `Request failed with status ${response.status}`;
+                        if (retryAfter) message += ` (try again in ${retryAfter}s)`;
+                        handlers.error({ message });
+                        return;
+                    }
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+                    while (true) {
+                        const { done, value } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
+                        const blocks = buffer.split('\\n\\n');
+                        buffer = blocks.pop();
+                        blocks.forEach(block => {
+                            const event = (block.match(/^event: (.*)$/m) || [])[1];
+                            const data = (block.match(/^data: (.*)$/m) || [])[1];
+                            if (handlers[event] && data) handlers[event](JSON.parse(data));
+                        });
+                        chatContainer.scrollTop = chatContainer.scrollHeight;
+                    }
+                    if (statusDiv.textContent) {
+                        handlers.error({ message: 'The connection closed before the reply finished.' });
+                    }
+                })
+                .catch(error => handlers.error({ message: error.message }));
             }
 
             // Event listener for the send button
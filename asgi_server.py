@@ -0,0 +1,235 @@
+"""
+Async serving mode for the MCP tools.
+
+Exposes the same /tools/<name>, /tools/batch, /manifest and /ready routes
+as mcp_server.py, but every tool has its own concurrency limit and wait
+queue, and CPU-bound work runs in a thread pool. A saturated
+creativity_score therefore never holds up math, weather or datetime.
+
+    uvicorn asgi_server:app --port 5001
+"""
+import asyncio
+import functools
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import mcp_server
+
+# Tools cheap enough to run directly on the event loop
+INLINE_TOOLS = {"math", "weather", "datetime"}
+
+# tool=concurrency/queue, e.g. "creativity_score=2/32,batch=4/16"
+DEFAULT_LIMITS = {
+    "math": (256, 1024),
+    "weather": (256, 1024),
+    "datetime": (256, 1024),
+    "creativity_score": (2, 32),
+    "batch": (4, 16),
+}
+QUEUE_TIMEOUT = float(os.environ.get("MCP_QUEUE_TIMEOUT", "5"))
+EXECUTOR_WORKERS = int(os.environ.get("MCP_EXECUTOR_WORKERS", str(os.cpu_count() or 4)))
+
+
+def parse_limits(spec):
+    limits = dict(DEFAULT_LIMITS)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tool, _, value = item.partition("=")
+        concurrency, _, queue_size = value.partition("/")
+        limits[tool.strip()] = (int(concurrency), int(queue_size or concurrency))
+    return limits
+
+
+class LimitExceeded(Exception):
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class ToolLimiter:
+    """
+    Concurrency semaphore plus a bounded wait queue for one tool. Callers
+    beyond the queue get a 429; callers that wait longer than the queue
+    timeout get a 503. Retry-After is estimated from recent latency.
+    """
+
+    def __init__(self, concurrency, max_queue, queue_timeout=QUEUE_TIMEOUT):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.avg_latency = 0.0
+
+    def retry_after(self):
+        backlog = (self.waiting + 1) / self.concurrency
+        return max(1, math.ceil(backlog * self.avg_latency))
+
+    async def acquire(self):
+        if not self.semaphore.locked():
+            # A slot is free, so this returns without suspending
+            await self.semaphore.acquire()
+            self.in_flight += 1
+            return
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LimitExceeded(429, "Too many requests queued for this tool", self.retry_after())
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LimitExceeded(503, "Timed out waiting for a free slot", self.retry_after())
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self, elapsed):
+        self.in_flight -= 1
+        self.semaphore.release()
+        # Exponentially weighted moving average of latency
+        self.avg_latency = elapsed if not self.avg_latency else 0.8 * self.avg_latency + 0.2 * elapsed
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "avg_latency": self.avg_latency,
+        }
+
+
+limiters = {
+    tool: ToolLimiter(concurrency, max_queue)
+    for tool, (concurrency, max_queue) in parse_limits(os.environ.get("MCP_TOOL_LIMITS", "")).items()
+}
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="mcp-tool")
+
+
+async def run_limited(name, func, arg, inline):
+    limiter = limiters.get(name)
+    if limiter is None:
+        limiter = limiters[name] = ToolLimiter(*DEFAULT_LIMITS["math"])
+    try:
+        await limiter.acquire()
+    except LimitExceeded as e:
+        return JSONResponse(
+            {"status": "error", "message": str(e)},
+            status_code=e.status,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    started = time.perf_counter()
+    try:
+        if inline:
+            result = func(arg)
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(executor, func, arg)
+    finally:
+        limiter.release(time.perf_counter() - started)
+    return result
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def tool_route(request):
+    tool = request.path_params["tool"]
+    if tool not in mcp_server.TOOL_HANDLERS:
+        return JSONResponse({"status": "error", "message": f"Unknown tool: {tool}"}, status_code=404)
+    params = await read_json(request)
+    if not isinstance(params, dict):
+        return JSONResponse({"status": "error", "message": "Expected a JSON object"}, status_code=400)
+
+    handler = functools.partial(mcp_server.call_tool, tool)
+    result = await run_limited(tool, handler, params, inline=tool in INLINE_TOOLS)
+    if isinstance(result, JSONResponse):
+        return result
+    body, status = result
+    return JSONResponse(body, status_code=status)
+
+
+async def batch_route(request):
+    data = await read_json(request)
+    calls = data.get("calls") if isinstance(data, dict) else data
+    if not isinstance(calls, list):
+        return JSONResponse({"status": "error", "message": "Expected a list of {tool, params} calls"}, status_code=400)
+    if len(calls) > mcp_server.BATCH_MAX_CALLS:
+        return JSONResponse(
+            {"status": "error", "message": f"At most {mcp_server.BATCH_MAX_CALLS} calls per batch"},
+            status_code=413
+        )
+
+    result = await run_limited("batch", mcp_server.run_batch, calls, inline=False)
+    if isinstance(result, JSONResponse):
+        return result
+    return JSONResponse({"status": "success", "results": result})
+
+
+async def manifest_route(request):
+    headers = {
+        "ETag": f'"{mcp_server.MANIFEST_ETAG}"',
+        "Cache-Control": f"public, max-age={mcp_server.MANIFEST_MAX_AGE}",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(mcp_server.MANIFEST_JSON, media_type="application/json", headers=headers)
+
+
+async def ready_route(request):
+    model = mcp_server.sentiment_analyzer
+    return JSONResponse(
+        {"status": "ready" if model.ready else "warming", "model": model.status()},
+        status_code=200 if model.ready else 503
+    )
+
+
+async def metrics_route(request):
+    # Tool metrics are recorded by mcp_server.call_tool and run_batch
+    return Response(mcp_server.metrics_registry.render(), media_type=mcp_server.METRICS_CONTENT_TYPE)
+
+
+async def limits_route(request):
+    return JSONResponse({tool: limiter.stats() for tool, limiter in limiters.items()})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Cheap tools are served immediately; the model loads in the background
+    mcp_server.sentiment_analyzer.warm_up()
+    yield
+    executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route("/tools/batch", batch_route, methods=["POST"]),
+        Route("/tools/{tool}", tool_route, methods=["POST"]),
+        Route("/manifest", manifest_route, methods=["GET"]),
+        Route("/ready", ready_route, methods=["GET"]),
+        Route("/limits", limits_route, methods=["GET"]),
+        Route("/metrics", metrics_route, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, port=5001)
@@ -0,0 +1,93 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class MicroBatchScheduler:
+    """
+    Gathers chunk-scoring work from concurrent requests and runs it through
+    the model in shared batches. A batch is flushed as soon as it holds
+    max_batch_size chunks or max_wait_ms after its first item arrived,
+    and each caller gets back only the scores for its own chunks.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=10):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started lazily so importing the server never spawns threads
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="sentiment-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, chunks) -> Future:
+        future = Future()
+        if not chunks:
+            future.set_result([])
+            return future
+        self._ensure_started()
+        self._queue.put((list(chunks), future))
+        return future
+
+    def score(self, chunks, timeout=None):
+        return self.submit(chunks).result(timeout)
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        texts = [chunk for chunks, _ in batch for chunk in chunks]
+        try:
+            scores = self.score_fn(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for chunks, future in batch:
+            future.set_result(scores[offset:offset + len(chunks)])
+            offset += len(chunks)
@@ -0,0 +1,390 @@
+"""
+Load generator and benchmark for the MCP server tools.
+
+Starts mcp_server.py in a child process (with the stub sentiment backend
+unless --real-model is given), drives the tool endpoints from closed-loop
+client threads at each concurrency level, and reports throughput, latency
+percentiles, server CPU time and peak RSS. Results are saved as JSON so
+runs can be compared:
+
+    python benchmark.py --concurrency 1,8,32 --duration 10 --output bench.json
+    python benchmark.py --compare bench.json --max-regression 10
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+DEFAULT_MIX = "math=4,weather=2,datetime=2,creativity_score=1,batch=1"
+DEFAULT_SIZES = "100,10000,100000,1000000"
+
+WORDS = (
+    "the a quiet river bright strange idea whispered over under morning machine garden "
+    "laughed stone blue silver forgotten map city wind carried dream slowly suddenly "
+    "and but or because while nobody everyone believed impossible tiny enormous"
+).split()
+PUNCTUATION = (".", ".", ".", "!", "?", ";", "...", " —")
+LOCATIONS = ("london", "tokyo", "new york", "paris", "sydney", "berlin")
+OPERATIONS = ("add", "subtract", "multiply", "divide")
+
+
+def make_text(size, rng):
+    """Sentences of random words, cut to exactly size characters."""
+    parts = []
+    length = 0
+    while length < size:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))
+        sentence = sentence.capitalize() + rng.choice(PUNCTUATION) + " "
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)[:size]
+
+
+class Workload:
+    """Builds (path, body) requests for each tool in the mix."""
+
+    def __init__(self, sizes, batch_size=10, seed=0):
+        rng = random.Random(seed)
+        self.texts = {size: make_text(size, rng) for size in sizes}
+        self.sizes = list(sizes)
+        self.batch_size = batch_size
+        self._ids = itertools.count()
+
+    def params(self, tool, rng):
+        if tool == "math":
+            return {"operation": rng.choice(OPERATIONS), "a": rng.uniform(-1000, 1000), "b": rng.uniform(1, 1000)}
+        if tool == "weather":
+            return {"location": rng.choice(LOCATIONS)}
+        if tool == "datetime":
+            return {}
+        if tool == "creativity_score":
+            # A unique prefix keeps repeated texts from being served by the result cache
+            return {"text": f"[{next(self._ids)}] " + self.texts[rng.choice(self.sizes)]}
+        raise ValueError(f"Unknown tool in mix: {tool}")
+
+    def request(self, tool, rng):
+        if tool == "batch":
+            calls = [
+                {"tool": name, "params": self.params(name, rng)}
+                for name in rng.choices(("math", "weather", "datetime"), k=self.batch_size)
+            ]
+            return "/tools/batch", {"calls": calls}
+        return f"/tools/{tool}", self.params(tool, rng)
+
+
+class ProcessMonitor:
+    """
+    CPU time and resident memory of the server process, from psutil when it
+    is installed and /proc otherwise. A sampler thread tracks peak RSS.
+    """
+
+    def __init__(self, pid, interval=0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = None
+        try:
+            import psutil
+            self._process = psutil.Process(pid)
+        except ImportError:
+            self._process = None
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self):
+        if self._process is not None:
+            times = self._process.cpu_times()
+            return times.user + times.system
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self._ticks
+        except OSError:
+            return None
+
+    def rss_bytes(self):
+        if self._process is not None:
+            return self._process.memory_info().rss
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = self.rss_bytes()
+            if rss:
+                self.peak_rss = max(self.peak_rss, rss)
+
+    def start(self):
+        self.peak_rss = self.rss_bytes() or 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.peak_rss
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for _, _, latency in samples)
+    statuses = Counter(str(status) for _, status, _ in samples)
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "status_codes": dict(statuses),
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) * 1000 if latencies else None,
+            "p50": percentile(latencies, 50) * 1000 if latencies else None,
+            "p95": percentile(latencies, 95) * 1000 if latencies else None,
+            "p99": percentile(latencies, 99) * 1000 if latencies else None,
+            "max": latencies[-1] * 1000 if latencies else None,
+        },
+    }
+
+
+def run_level(base_url, workload, mix, concurrency, duration, max_requests, seed, timeout, monitor=None):
+    """Runs concurrency client threads until the duration or request count is used up."""
+    tools, weights = zip(*mix.items())
+    samples = []
+    issued = itertools.count()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        local = []
+        while True:
+            if deadline and time.perf_counter() >= deadline:
+                break
+            if max_requests and next(issued) >= max_requests:
+                break
+            tool = rng.choices(tools, weights)[0]
+            path, body = workload.request(tool, rng)
+            started = time.perf_counter()
+            try:
+                response = session.post(base_url + path, json=body, timeout=timeout)
+                status = response.status_code
+            except requests.RequestException:
+                status = 0
+            local.append((tool, status, time.perf_counter() - started))
+        session.close()
+        samples.extend(local)
+
+    cpu_before = monitor.cpu_seconds() if monitor else None
+    if monitor:
+        monitor.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    peak_rss = monitor.stop() if monitor else None
+    cpu_after = monitor.cpu_seconds() if monitor else None
+
+    result = {"concurrency": concurrency, "seconds": elapsed}
+    result.update(summarize(samples, elapsed))
+    result["per_tool"] = {
+        tool: summarize([s for s in samples if s[0] == tool], elapsed)
+        for tool in sorted({s[0] for s in samples})
+    }
+    if cpu_before is not None and cpu_after is not None:
+        result["server_cpu_seconds"] = cpu_after - cpu_before
+        result["server_cpu_percent"] = (cpu_after - cpu_before) / elapsed * 100 if elapsed else 0.0
+    if peak_rss:
+        result["server_peak_rss_mb"] = peak_rss / 2 ** 20
+    return result
+
+
+def start_server(port, real_model, cache, stub_ms):
+    env = dict(os.environ)
+    if not real_model:
+        env["SENTIMENT_BACKEND"] = "stub"
+        env["SENTIMENT_STUB_MS"] = str(stub_ms)
+    env.setdefault("SENTIMENT_WARMUP", "1")
+    if not cache:
+        env["CREATIVITY_CACHE_SIZE"] = "0"
+        env["CHUNK_CACHE_SIZE"] = "0"
+        env.pop("CREATIVITY_CACHE_PATH", None)
+    here = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port)], env=env, cwd=here)
+
+
+def wait_until_ready(base_url, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if requests.get(base_url + "/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} was not ready after {timeout}s")
+
+
+def serve(port):
+    import logging
+    import mcp_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    mcp_server.app.run(host="127.0.0.1", port=port, threaded=True, debug=False, use_reloader=False)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def compare(baseline, current, max_regression):
+    """Prints RPS and p95 changes per concurrency level; returns False on a regression."""
+    before = {level["concurrency"]: level for level in baseline["results"]}
+    ok = True
+    print(f"\n{'conc':>5} {'rps before':>11} {'rps now':>9} {'Δ':>7}   {'p95 before':>10} {'p95 now':>8} {'Δ':>7}")
+    for level in current["results"]:
+        old = before.get(level["concurrency"])
+        if old is None:
+            continue
+        rps_change = (level["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+        old_p95, new_p95 = old["latency_ms"]["p95"], level["latency_ms"]["p95"]
+        p95_change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 and new_p95 else 0.0
+        print(f"{level['concurrency']:>5} {old['rps']:>11.1f} {level['rps']:>9.1f} {rps_change:>+6.1f}%"
+              f"   {old_p95 or 0:>10.1f} {new_p95 or 0:>8.1f} {p95_change:>+6.1f}%")
+        if max_regression is not None and (rps_change < -max_regression or p95_change > max_regression):
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP server tools")
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="PID of the --url server, for CPU and RSS figures")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--requests", type=int, default=0, help="Stop each level after this many requests")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unrecorded load first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="tool=weight pairs; 'batch' posts to /tools/batch")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Creativity text sizes in characters")
+    parser.add_argument("--batch-size", type=int, default=10, help="Calls per /tools/batch request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--real-model", action="store_true", help="Load the real sentiment model")
+    parser.add_argument("--stub-ms", type=float, default=0.0, help="Simulated stub cost per chunk in ms")
+    parser.add_argument("--cache", action="store_true", help="Keep the creativity caches enabled")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Exit non-zero if RPS drops or p95 rises by more than this percentage")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    mix = parse_mix(args.mix)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    workload = Workload(sizes, args.batch_size, args.seed)
+
+    process = None
+    base_url = args.url.rstrip("/") if args.url else f"http://127.0.0.1:{args.port}"
+    if not args.url:
+        process = start_server(args.port, args.real_model, args.cache, args.stub_ms)
+    pid = process.pid if process else args.pid
+    try:
+        wait_until_ready(base_url, process, args.ready_timeout)
+        monitor = ProcessMonitor(pid) if pid else None
+        if args.warmup:
+            run_level(base_url, workload, mix, levels[0], args.warmup, 0, args.seed, args.timeout)
+
+        results = []
+        for concurrency in levels:
+            result = run_level(base_url, workload, mix, concurrency, args.duration, args.requests,
+                               args.seed, args.timeout, monitor)
+            results.append(result)
+            latency = result["latency_ms"]
+            print(f"concurrency={concurrency:<4} requests={result['requests']:<6} errors={result['errors']:<4} "
+                  f"rps={result['rps']:.1f} p50={latency['p50'] or 0:.1f}ms p95={latency['p95'] or 0:.1f}ms "
+                  f"p99={latency['p99'] or 0:.1f}ms cpu={result.get('server_cpu_seconds', 0):.2f}s "
+                  f"peak_rss={result.get('server_peak_rss_mb', 0):.0f}MB")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "url": base_url,
+            "model": "real" if args.real_model else "stub",
+            "cache": args.cache,
+            "mix": mix,
+            "sizes": sizes,
+            "duration": args.duration,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(baseline, report, args.max_regression):
+            print("Regression beyond --max-regression")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
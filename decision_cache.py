@@ -0,0 +1,45 @@
+import hashlib
+import re
+
+from ttl_cache import TTLCache
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Lower-cases, collapses whitespace and drops trailing punctuation."""
+    return _WHITESPACE.sub(" ", text.strip().lower()).rstrip("?!. ")
+
+
+def tools_fingerprint(tools):
+    """Hash of the tool names and descriptions offered to the LLM."""
+    digest = hashlib.sha256()
+    for tool in tools:
+        digest.update(tool.name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(str(tool.description).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class DecisionCache:
+    """
+    Caches the LLM's {tool, params} choice per normalized user message and
+    tool list, so repeated questions skip the selection round trip. Any
+    store with get/set/stats (TTLCache by default) can back it.
+    """
+
+    def __init__(self, store=None, maxsize=10000, ttl=None, path=None):
+        self.store = store or TTLCache(maxsize=maxsize, ttl=ttl, path=path, table="tool_decisions")
+
+    def key(self, user_input, fingerprint):
+        return f"{fingerprint}:{normalize_query(user_input)}"
+
+    def get(self, user_input, fingerprint):
+        return self.store.get(self.key(user_input, fingerprint))
+
+    def set(self, user_input, fingerprint, decision):
+        self.store.set(self.key(user_input, fingerprint), decision)
+
+    def stats(self):
+        return self.store.stats()
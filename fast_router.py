@@ -0,0 +1,171 @@
+"""
+Rule-based pre-router for chat messages that map directly onto a tool.
+
+Rules are built from a ToolIndex: they are only enabled for tools in the
+manifest, math operations come from the manifest's enum, and every
+candidate call is checked against the index's compiled input validator.
+A message is routed only when exactly one tool matches with all required
+arguments and the message does not ask for several things at once;
+anything else returns None and goes to the LLM.
+"""
+import re
+
+from tool_validators import ValidationError
+
+NUMBER = r"-?\d+(?:\.\d+)?"
+
+# Words and symbols for each math operation in the manifest's enum
+MATH_SYNONYMS = {
+    "add": ("add", "plus", "sum", "+"),
+    "subtract": ("subtract", "minus", "-"),
+    "multiply": ("multiply", "multiplied", "times", "product", "*", "x", "×"),
+    "divide": ("divide", "divided", "over", "/", "÷"),
+}
+
+_BINARY_EXPRESSION = re.compile(rf"({NUMBER})\s*([+\-*/x×÷])\s*({NUMBER})")
+_NUMBERS = re.compile(NUMBER)
+_WORDS = re.compile(r"[a-z]+")
+
+_DATE_QUESTION = re.compile(
+    r"\b(?:what(?:'s| is) (?:the |today's )?date|today'?s date|current date|what day is (?:it|today))\b"
+)
+_TIME_QUESTION = re.compile(
+    r"\b(?:what time is it|what(?:'s| is) the (?:current )?time|current time|time (?:is it )?now)\b"
+)
+
+# Both weather forms must cover the whole message (after trailing filler is
+# stripped), so "weather in london tomorrow" or "nice weather" never routes
+_WEATHER_IN = re.compile(
+    r"(?:(?:what(?:'s| is)|how(?:'s| is)|tell me|show me|give me|get|check) )?(?:the )?(?:current )?"
+    r"(?:weather|temperature|forecast)(?: like)?(?: today| now| right now)? (?:in|for|at) (.+)"
+)
+_WEATHER_PREFIX = re.compile(r"(.+?) (?:weather|forecast)")
+_TRAILING_FILLER = re.compile(r"(?:[\s,.!?]|\b(?:today|right now|now|please|currently)\b)+$")
+_LOCATION = re.compile(r"[a-z][a-z .'-]*")
+# "tokyo and london", "london, paris": several locations need several calls
+_LOCATION_LIST = re.compile(r"\b(?:and|or|plus)\b|[,&/]")
+# Words that show the capture is part of a question or a time, not a place
+_NOT_LOCATION = frozenset("""
+    what what's whats how how's hows when where why which who is are was were be will would
+    does do did can should could the a an this that these those it there my your our like going
+    today tomorrow yesterday tonight weekend week month next last day days morning afternoon evening
+    nice good bad great lovely terrible awful hot cold warm sunny rainy
+""".split())
+
+_QUOTED = re.compile(r"[\"“](.+?)[\"”]", re.S)
+
+# Splits "weather in tokyo and today's date" into its parts
+_CONJUNCTIONS = re.compile(r"\b(?:and|or|plus|also|then)\b|[;,&]")
+
+
+def _normalize(message):
+    return re.sub(r"\s+", " ", message.strip().lower())
+
+
+class FastRouter:
+    def __init__(self, index):
+        self.tools = index.tools
+        self.validators = index.validators
+        self.rules = [
+            (name, rule) for name, rule in (
+                ("math", self._math),
+                ("datetime", self._datetime),
+                ("weather", self._weather),
+                ("creativity_score", self._creativity),
+            ) if name in self.tools
+        ]
+        operations = self._enum("math", "operation")
+        self.math_ops = {op: MATH_SYNONYMS[op] for op in operations if op in MATH_SYNONYMS}
+        self.routed = 0
+        self.passed = 0
+
+    def _enum(self, tool, prop):
+        schema = self.tools.get(tool, {}).get("input_schema", {})
+        return schema.get("properties", {}).get(prop, {}).get("enum", [])
+
+    def route(self, message):
+        """Returns {"tool", "params"} for a confident match, else None."""
+        text = _normalize(message)
+        matches = []
+        for name, rule in self.rules:
+            params = rule(text, message)
+            if params is not None:
+                matches.append((name, params))
+
+        if len(matches) == 1 and not self._is_compound(text, message):
+            name, params = matches[0]
+            try:
+                params = self.validators[name](params)
+            except ValidationError:
+                params = None
+            if params is not None:
+                self.routed += 1
+                return {"tool": name, "params": params}
+        self.passed += 1
+        return None
+
+    def _is_compound(self, text, message):
+        """True when two or more parts of the message each look like a tool call."""
+        parts = [part.strip() for part in _CONJUNCTIONS.split(text) if part.strip()]
+        if len(parts) < 2:
+            return False
+        hits = sum(1 for part in parts if any(rule(part, message) is not None for _, rule in self.rules))
+        return hits >= 2
+
+    def stats(self):
+        total = self.routed + self.passed
+        return {
+            "routed": self.routed,
+            "passed_to_llm": self.passed,
+            "routed_rate": self.routed / total if total else 0.0,
+        }
+
+    def _math(self, text, message):
+        numbers = _NUMBERS.findall(text)
+        if len(numbers) != 2:
+            return None
+
+        expression = _BINARY_EXPRESSION.search(text)
+        if expression:
+            a, symbol, b = expression.groups()
+            ops = [op for op, words in self.math_ops.items() if symbol in words]
+        else:
+            words = set(_WORDS.findall(text))
+            ops = [op for op, synonyms in self.math_ops.items() if words & set(synonyms)]
+            a, b = numbers
+            # "subtract 2 from 9" means 9 - 2
+            if ops == ["subtract"] and "from" in words and text.index("from") < text.rindex(b):
+                a, b = b, a
+        if len(ops) != 1:
+            return None
+        return {"operation": ops[0], "a": float(a), "b": float(b)}
+
+    def _datetime(self, text, message):
+        if _DATE_QUESTION.search(text):
+            return {"format": "%Y-%m-%d"}
+        match = _TIME_QUESTION.search(text)
+        # "what time is it in Tokyo" needs a timezone the tool doesn't take
+        if match and not re.match(r" (?:in|at) ", text[match.end():]):
+            return {}
+        return None
+
+    def _weather(self, text, message):
+        body = _TRAILING_FILLER.sub("", text)
+        match = _WEATHER_IN.fullmatch(body) or _WEATHER_PREFIX.fullmatch(body)
+        if not match:
+            return None
+        location = match.group(1).strip(" .'-")
+        words = location.split()
+        if not _LOCATION.fullmatch(location) or not 0 < len(words) <= 3:
+            return None
+        if _LOCATION_LIST.search(location) or _NOT_LOCATION.intersection(words):
+            return None
+        return {"location": location}
+
+    def _creativity(self, text, message):
+        if "creativ" not in text:
+            return None
+        quoted = _QUOTED.search(message)
+        if not quoted:
+            return None
+        return {"text": quoted.group(1)}
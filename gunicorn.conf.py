@@ -0,0 +1,54 @@
+# Gunicorn settings for serving mcp_server with several worker processes.
+#
+#     gunicorn mcp_server:app
+#
+# By default the sentiment model is loaded once in the master before the
+# workers fork, so every worker shares the same weights copy-on-write.
+# Set SENTIMENT_SERVER to use a dedicated inference process instead
+# (see model_server.py); workers then never load the model themselves.
+#
+# Metrics are shared through files in MCP_METRICS_DIR, so /metrics on any
+# worker reports the totals of all of them.
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get("MCP_BIND", "127.0.0.1:5001")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("MCP_THREADS", "4"))
+preload_app = not os.environ.get("SENTIMENT_SERVER")
+# Set before the app is imported, so the master and workers all see it
+metrics_dir = os.environ.setdefault(
+    "MCP_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"mcp-metrics-{bind.replace(':', '-').replace('/', '-')}")
+)
+
+# Torch threads per worker, so N workers don't oversubscribe the cores
+torch_threads = int(os.environ.get("SENTIMENT_THREADS", "1"))
+# The stub backend never loads torch, and may run where it isn't installed
+uses_torch = os.environ.get("SENTIMENT_BACKEND", "pytorch") != "stub"
+
+
+def on_starting(server):
+    # Counters restart with the server; drop files left by the previous run
+    # (the master's own file, if any, is rewritten by its writer thread)
+    for path in glob.glob(os.path.join(metrics_dir, "metrics-*.json")):
+        os.remove(path)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import mcp_server
+    mcp_server.sentiment_analyzer.warm_up(background=False)
+    # Keep the garbage collector from touching (and so copying) the
+    # model's pages in every worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app or not uses_torch:
+        return
+    import torch
+    torch.set_num_threads(torch_threads)
@@ -1,32 +1,55 @@
 import os
 import json
+import queue
+import threading
+import uuid
 from pathlib import Path
 import traceback
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import HumanMessage, AIMessage
 
-from langchain.memory import ConversationBufferMemory
 from langchain_openai import ChatOpenAI
-from langchain.agents import AgentExecutor, create_react_agent
+from langchain.agents import create_react_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 from advanced_mcp_client import AdvancedMCPClient
+from agent_budget import BudgetedExecutor
+from agent_pool import AgentPool, PoolExhausted
+from session_memory import SessionMemory
 
 app = Flask(__name__)
 
-# Initialize MCP client
-mcp_client = AdvancedMCPClient()
-tools = mcp_client.get_tools()
+# Wall-clock budget per agent turn. The executor checks it between steps;
+# the LLM and tool request timeouts below bound a single step, so a turn
+# ends within about twice the budget even if a call hangs.
+AGENT_MAX_EXECUTION_TIME = float(os.environ.get("AGENT_MAX_EXECUTION_TIME", "30"))
 
-# Create memory
-memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+# Initialize MCP client; its retries share one turn budget
+MCP_RETRIES = 3
+mcp_client = AdvancedMCPClient(timeout=AGENT_MAX_EXECUTION_TIME / (MCP_RETRIES + 1), retries=MCP_RETRIES)
+tools_index = mcp_client.tool_index
+tools = mcp_client.get_tools()
 
 os.environ["OPENAI_API_KEY"] = ""
 
 # Create LLM
 if not os.environ.get("OPENAI_API_KEY"):
     raise EnvironmentError("OPENAI_API_KEY not set. Please configure it before running.")
-llm = ChatOpenAI(temperature=0, model="gpt-4")
+# streaming=True makes the LLM report tokens to callbacks, for /api/chat/stream
+# No retries: a retried call could outlast the turn budget
+llm = ChatOpenAI(temperature=0, model="gpt-4", streaming=True, timeout=AGENT_MAX_EXECUTION_TIME, max_retries=0)
+
+# Conversation memory per session id: recent turns within a token budget,
+# older ones summarized. Idle sessions expire; SESSION_STORE_PATH persists
+# them to SQLite.
+sessions = SessionMemory(
+    summarize=lambda prompt: llm.invoke(prompt).content,
+    max_tokens=int(os.environ.get("SESSION_MEMORY_TOKENS", "2000")),
+    maxsize=int(os.environ.get("SESSION_MAX", "1000")),
+    ttl=float(os.environ.get("SESSION_TTL", "3600")),
+    path=os.environ.get("SESSION_STORE_PATH")
+)
 
 # Create agent prompt
 prompt = ChatPromptTemplate.from_messages([
@@ -48,44 +71,176 @@ When using tools:
 ])
 
 # Create the agent
-tool_names = "\n".join([f"- {tool.name}" for tool in tools])
-agent = create_react_agent(
-    llm=llm,
-    tools=tools,
-    prompt=prompt.partial(tool_names=tool_names, tools=tools)
-)
+def build_agent(tools):
+    tool_names = "\n".join([f"- {tool.name}" for tool in tools])
+    return create_react_agent(
+        llm=llm,
+        tools=tools,
+        prompt=prompt.partial(tool_names=tool_names, tools=tools)
+    )
 
-# Create agent executor
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    memory=memory,
-    verbose=True,
-    handle_parsing_errors=True,
+agent = build_agent(tools)
+
+# Agent executors, pre-built from the shared agent and tools; each request
+# checks one out, so at most AGENT_POOL_SIZE turns run at once. Each turn is
+# capped at AGENT_MAX_ITERATIONS steps and AGENT_MAX_EXECUTION_TIME seconds.
+def build_executor():
+    return BudgetedExecutor(
+        agent,
+        tools,
+        max_iterations=int(os.environ.get("AGENT_MAX_ITERATIONS", "6")),
+        max_execution_time=AGENT_MAX_EXECUTION_TIME,
+        verbose=True,
+        handle_parsing_errors=True,
+    )
+
+agent_pool = AgentPool(
+    build_executor,
+    size=int(os.environ.get("AGENT_POOL_SIZE", "4")),
+    checkout_timeout=float(os.environ.get("AGENT_CHECKOUT_TIMEOUT", "30"))
 )
 
+# The manifest is revalidated in the background; when it changes, the tools,
+# agent and pooled executors are rebuilt before the next request uses them.
+tools_lock = threading.Lock()
+
+@app.before_request
+def refresh_tools():
+    global tools_index, tools, agent
+    if mcp_client.tool_index is tools_index:
+        return
+    with tools_lock:
+        index = mcp_client.tool_index
+        if index is tools_index:
+            return
+        tools = mcp_client.get_tools()
+        agent = build_agent(tools)
+        tools_index = index
+        agent_pool.rebuild(build_executor)
+
 @app.route('/')
 def index():
     return render_template('index.html', tools=tools)
 
+def agent_inputs(user_input, session_id):
+    return {
+        "input": user_input,
+        "chat_history": sessions.history(session_id),
+        "agent_scratchpad": []  # Must be a list of LangChain messages
+    }
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     data = request.json
     user_input = data.get('message', '')
+    session_id = data.get('session_id') or uuid.uuid4().hex
 
     try:
         print(f"Received user input: {user_input}")
-        response = agent_executor.invoke({
-            "input": user_input,
-            "chat_history": [],  # Empty list for now
-            "agent_scratchpad": []  # Must be a list of LangChain messages
-        })
+        with agent_pool.checkout() as executor:
+            response = executor.invoke(agent_inputs(user_input, session_id))
         print(f"LLM response: {response}")
-        return jsonify({"response": response.get("output", "[No output]")})
+        output = response.get("output", "[No output]")
+        sessions.add_turn(session_id, user_input, output)
+        return jsonify({
+            "response": output,
+            "session_id": session_id,
+            "stopped_early": response["stopped_early"]
+        })
+    except PoolExhausted as e:
+        return pool_exhausted(e)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def pool_exhausted(error):
+    return jsonify({"error": str(error)}), 503, {"Retry-After": str(error.retry_after)}
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class EventQueueHandler(BaseCallbackHandler):
+    """Forwards agent progress and LLM tokens to a queue as (event, data) pairs."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.events.put(("token", {"text": token}))
+
+    def on_agent_action(self, action, **kwargs):
+        self.events.put(("tool_selected", {"calls": [{"tool": action.tool, "params": action.tool_input}]}))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.events.put(("tool_started", {"tool": (serialized or {}).get("name"), "params": input_str}))
+
+    def on_tool_end(self, output, **kwargs):
+        self.events.put(("partial", {"tool": kwargs.get("name"), "result": str(output)}))
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streaming variant of /api/chat. Sends server-sent events as the agent
+    works: "token" (LLM output), "tool_selected", "tool_started", "partial"
+    (each tool's output), then "final" or "error".
+    """
+    data = request.json
+    user_input = data.get('message', '')
+    session_id = data.get('session_id') or uuid.uuid4().hex
+    events = queue.Queue()
+    # Checked out before the stream starts, so a busy pool is a plain 503
+    try:
+        executor = agent_pool.acquire()
+    except PoolExhausted as e:
+        return pool_exhausted(e)
+
+    def run_agent():
+        try:
+            try:
+                response = executor.invoke(
+                    agent_inputs(user_input, session_id),
+                    config={"callbacks": [EventQueueHandler(events)]}
+                )
+            finally:
+                agent_pool.release(executor)
+            output = response.get("output", "[No output]")
+            events.put(("final", {
+                "response": output,
+                "session_id": session_id,
+                "stopped_early": response["stopped_early"]
+            }))
+            sessions.add_turn(session_id, user_input, output)
+        except Exception as e:
+            traceback.print_exc()
+            events.put(("error", {"message": str(e)}))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run_agent, name="agent-stream", daemon=True).start()
+
+    def generate():
+        for event, payload in iter(events.get, None):
+            yield sse_event(event, payload)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/agents/stats', methods=['GET'])
+def agent_stats():
+    return jsonify(agent_pool.stats())
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def session_stats():
+    return jsonify(sessions.stats())
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def clear_session(session_id):
+    sessions.clear(session_id)
+    return jsonify({"status": "cleared", "session_id": session_id})
+
 @app.route('/api/tools', methods=['GET'])
 def get_tools():
     tool_info = []
@@ -112,6 +267,9 @@ if __name__ == '__main__':
         #send-button { padding: 8px 15px; }
         .user-message { text-align: right; margin: 5px; padding: 8px; background-color: #e3f2fd; border-radius: 8px; }
         .bot-message { text-align: left; margin: 5px; padding: 8px; background-color: #f1f1f1; border-radius: 8px; }
+        .status { color: #666; font-size: 0.9em; }
+        .status:empty { display: none; }
+        .content { white-space: pre-wrap; }
         .tools-section { margin-top: 20px; }
         .tool-card { border: 1px solid #ddd; padding: 10px; margin-bottom: 10px; border-radius: 5px; }
     </style>
@@ -136,6 +294,10 @@ if __name__ == '__main__':
             const sendButton = document.getElementById('send-button');
             const toolsList = document.getElementById('tools-list');
 
+            // One conversation per browser tab
+            const sessionId = sessionStorage.getItem('mcp-session-id') || crypto.randomUUID();
+            sessionStorage.setItem('mcp-session-id', sessionId);
+
             fetch('/api/tools')
                 .then(response => response.json())
                 .then(tools => {
@@ -147,6 +309,10 @@ if __name__ == '__main__':
                     });
                 });
 
+            function formatResult(value) {
+                return typeof value === 'object' ? JSON.stringify(value, null, 2) : String(value);
+            }
+
             function sendMessage() {
                 const message = messageInput.value.trim();
                 if (!message) return;
@@ -158,19 +324,81 @@ if __name__ == '__main__':
                 chatContainer.scrollTop = chatContainer.scrollHeight;
                 messageInput.value = '';
 
-                fetch('/api/chat', {
+                const botMessageDiv = document.createElement('div');
+                botMessageDiv.className = 'bot-message';
+                const statusDiv = document.createElement('div');
+                statusDiv.className = 'status';
+                statusDiv.textContent = 'Thinking…';
+                const contentDiv = document.createElement('div');
+                contentDiv.className = 'content';
+                botMessageDiv.append(statusDiv, contentDiv);
+                chatContainer.appendChild(botMessageDiv);
+
+                const running = [];
+                let finished = 0;
+                const handlers = {
+                    token: data => { contentDiv.textContent += data.text; },
+                    tool_selected: data => {
+                        statusDiv.textContent = 'Selected: ' + data.calls.map(call => call.tool).join(', ');
+                        contentDiv.textContent = '';
+                    },
+                    tool_started: data => {
+                        running.push(data.tool);
+                        statusDiv.textContent = `Running ${running.join(', ')} (${finished}/${running.length} done)`;
+                    },
+                    partial: data => {
+                        finished += 1;
+                        statusDiv.textContent = `Running ${running.join(', ')} (${finished}/${running.length} done)`;
+                        contentDiv.textContent += `${data.tool}:\\n${formatResult(data.result)}\\n\\n`;
+                    },
+                    final: data => {
+                        statusDiv.textContent = '';
+                        contentDiv.textContent = formatResult(data.response || '[No response]');
+                    },
+                    error: data => {
+                        statusDiv.textContent = '';
+                        contentDiv.textContent = 'Error: ' + data.message;
+                    }
+                };
+
+                // EventSource can't POST, so the event stream is read from fetch
+                fetch('/api/chat/stream', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ message })
+                    body: JSON.stringify({ message, session_id: sessionId })
                 })
-                .then(response => response.json())
-                .then(data => {
-                    const botMessageDiv = document.createElement('div');
-                    botMessageDiv.className = 'bot-message';
-                    botMessageDiv.textContent = data.response || '[No response]';
-                    chatContainer.appendChild(botMessageDiv);
-                    chatContainer.scrollTop = chatContainer.scrollHeight;
-                });
+                .then(async response => {
+                    // Errors such as a busy agent pool (503) come back as plain JSON
+                    const type = response.headers.get('Content-Type') || '';
+                    if (!response.ok || !type.startsWith('text/event-stream')) {
+                        const body = await response.json().catch(() => ({}));
+                        const retryAfter = response.headers.get('Retry-After');
+                        let message = body.error || `Request failed with status ${response.status}`;
+                        if (retryAfter) message += ` (try again in ${retryAfter}s)`;
+                        handlers.error({ message });
+                        return;
+                    }
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+                    while (true) {
+                        const { done, value } = await reader.read();
+                        if (done) break;
+                        buffer += decoder.decode(value, { stream: true });
+                        const blocks = buffer.split('\\n\\n');
+                        buffer = blocks.pop();
+                        blocks.forEach(block => {
+                            const event = (block.match(/^event: (.*)$/m) || [])[1];
+                            const data = (block.match(/^data: (.*)$/m) || [])[1];
+                            if (handlers[event] && data) handlers[event](JSON.parse(data));
+                        });
+                        chatContainer.scrollTop = chatContainer.scrollHeight;
+                    }
+                    if (statusDiv.textContent) {
+                        handlers.error({ message: 'The connection closed before the reply finished.' });
+                    }
+                })
+                .catch(error => handlers.error({ message: error.message }));
             }
 
             sendButton.addEventListener('click', sendMessage);
@@ -1,7 +1,9 @@
 import os
 import json
 import requests
-from typing import List
+from mcp_client_core import manifest_cache as shared_manifest_cache
+from tool_validators import ValidationError
+from typing import Tuple
 
 # Optional: if you want to still show LLM response (not required for tool tests)
 from langchain_openai import ChatOpenAI
@@ -10,24 +12,29 @@ from langchain_openai import ChatOpenAI
 os.environ["OPENAI_API_KEY"] = "your-api-key-here"
 
 class MCPClient:
-    def __init__(self, base_url="http://localhost:5001"):
+    def __init__(self, base_url="http://localhost:5001", manifest_cache=None):
         self.base_url = base_url
-        self.manifest = self._fetch_manifest()
+        self.manifest_cache = manifest_cache or shared_manifest_cache
 
-    def _fetch_manifest(self):
-        response = requests.get(f"{self.base_url}/manifest")
-        return response.json()
+    @property
+    def manifest(self):
+        return self.manifest_cache.get(self.base_url, default={"tools": []})
+
+    @property
+    def index(self):
+        return self.manifest_cache.index(self.base_url, default={"tools": []})
 
-    def list_tools(self) -> List[str]:
-        return [tool["name"] for tool in self.manifest.get("tools", [])]
+    def list_tools(self) -> Tuple[str, ...]:
+        return self.index.names
 
     def get_tool_schema(self, tool_name: str):
-        for tool in self.manifest.get("tools", []):
-            if tool["name"] == tool_name:
-                return tool
-        return None
+        return self.index.get(tool_name)
 
     def call_tool(self, tool_name: str, params: dict):
+        try:
+            params = self.index.validate(tool_name, params)
+        except ValidationError as e:
+            return {"status": "error", "message": str(e)}
         response = requests.post(f"{self.base_url}/tools/{tool_name}", json=params)
         return response.json()
 
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+
+from tool_validators import ValidationError, compile_validator
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "mcp-in-the-wild", "manifests.json")
+DEFAULT_MAX_AGE = 60
+
+
+class ToolIndex:
+    """
+    Lookup tables for one manifest version: tool name to tool and input
+    schema, plus each tool's required fields and property order. Built
+    once per manifest so lookups never scan the tool list.
+    """
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.tools = {tool["name"]: tool for tool in manifest.get("tools", [])}
+        self.names = tuple(self.tools)
+        self.schemas = {name: tool.get("input_schema", {}) for name, tool in self.tools.items()}
+        self.required = {name: tuple(schema.get("required", [])) for name, schema in self.schemas.items()}
+        self.properties = {name: tuple(schema.get("properties", {})) for name, schema in self.schemas.items()}
+        self.validators = {name: compile_validator(schema) for name, schema in self.schemas.items()}
+
+    def __contains__(self, name):
+        return name in self.tools
+
+    def __len__(self):
+        return len(self.tools)
+
+    def get(self, name):
+        return self.tools.get(name)
+
+    def validate(self, name, params):
+        """
+        Checks and coerces params against the tool's input schema, raising
+        ValidationError before anything is sent to the server.
+        """
+        validator = self.validators.get(name)
+        if validator is None:
+            raise ValidationError(f"Unknown tool: {name}")
+        return validator(params)
+
+    def default_param(self, name):
+        """
+        The parameter a bare string argument is assigned to: the first
+        required field, else the first property, else "query".
+        """
+        if self.required.get(name):
+            return self.required[name][0]
+        if self.properties.get(name):
+            return self.properties[name][0]
+        return "query"
+
+
+class ManifestCache:
+    """
+    Manifest cache shared by the MCP clients, keyed by server base URL.
+
+    Manifests are kept in memory and in a JSON file on disk, so a cold start
+    can skip the /manifest round trip. Once an entry is older than the
+    server's Cache-Control max-age it is still served, but revalidated in
+    the background with a conditional GET (If-None-Match), so tools added
+    on the server reach running clients without a restart. A stale entry
+    read from disk is revalidated before its first use instead, so a
+    process never starts on a manifest it has not checked.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, default_max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.default_max_age = default_max_age
+        self._entries = {}
+        self._indexes = {}
+        self._refreshing = set()
+        # Base URLs revalidated by this process, as opposed to only read from disk
+        self._verified = set()
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self._entries.update(json.load(f))
+        except (OSError, ValueError):
+            # A corrupt cache file only costs one network fetch
+            pass
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def get(self, base_url, session=None, default=None):
+        """Returns the cached manifest, fetching it only if none is cached."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(base_url)
+        if entry is None:
+            entry = self.refresh(base_url, session)
+            return entry["manifest"] if entry else default
+        if time.time() - entry["fetched"] > entry.get("max_age", self.default_max_age):
+            if base_url in self._verified:
+                self.refresh_in_background(base_url, session)
+            else:
+                try:
+                    entry = self.refresh(base_url, session) or entry
+                except requests.RequestException:
+                    # Server unreachable: the disk copy is better than nothing
+                    pass
+        return entry["manifest"]
+
+    def index(self, base_url, session=None, default=None):
+        """Returns the ToolIndex of the current manifest, rebuilt only when it changes."""
+        manifest = self.get(base_url, session, default)
+        cached = self._indexes.get(base_url)
+        if cached is not None and cached.manifest is manifest:
+            return cached
+        index = ToolIndex(manifest or {})
+        self._indexes[base_url] = index
+        return index
+
+    def version(self, base_url):
+        entry = self._entries.get(base_url)
+        return entry.get("etag") if entry else None
+
+    def refresh(self, base_url, session=None):
+        """Revalidates the manifest with the server and returns the entry."""
+        with self._lock:
+            entry = self._entries.get(base_url)
+        headers = {"If-None-Match": entry["etag"]} if entry and entry.get("etag") else {}
+        response = (session or requests).get(f"{base_url}/manifest", headers=headers, timeout=10)
+
+        if response.status_code == 304 and entry:
+            entry = dict(entry, fetched=time.time())
+        elif response.status_code == 200:
+            entry = {
+                "manifest": response.json(),
+                "etag": response.headers.get("ETag"),
+                "fetched": time.time(),
+                "max_age": self._max_age(response.headers.get("Cache-Control", "")),
+            }
+        else:
+            return entry
+
+        with self._lock:
+            self._entries[base_url] = entry
+            self._verified.add(base_url)
+            self._save()
+        return entry
+
+    def refresh_in_background(self, base_url, session=None):
+        with self._lock:
+            if base_url in self._refreshing:
+                return
+            self._refreshing.add(base_url)
+
+        def _refresh():
+            try:
+                self.refresh(base_url, session)
+            except requests.RequestException:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(base_url)
+
+        threading.Thread(target=_refresh, name="manifest-refresh", daemon=True).start()
+
+    def _max_age(self, cache_control):
+        match = re.search(r"max-age=(\d+)", cache_control)
+        return int(match.group(1)) if match else self.default_max_age
+
+    def invalidate(self, base_url=None):
+        with self._lock:
+            if base_url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(base_url, None)
+            self._save()
+
+
+# One cache per process, shared by every client unless one is passed in
+manifest_cache = ManifestCache(os.environ.get("MCP_MANIFEST_CACHE", DEFAULT_CACHE_PATH) or None)
@@ -1,23 +1,66 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 import requests
 import json
 from datetime import datetime
 import os
-from transformers import pipeline
+import time
+import hashlib
+import codecs
 import numpy as np
+from batching import MicroBatchScheduler
+from ttl_cache import TTLCache
+from sentiment_model import SentimentModel
+from text_features import extract_features, extract_features_batch, StreamingFeatures
+from model_server import RemoteSentimentModel, authkey_from_env
+from tool_validators import ValidationError, compile_validators
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
 
+# Request counters and latency histograms, served at /metrics. Tool metrics
+# are recorded in call_tool and run_batch, so they also cover asgi_server.py.
+# With several worker processes, set MCP_METRICS_DIR so each of them reports
+# the totals of all (gunicorn.conf.py does this by default).
+metrics_registry = Registry(os.environ.get("MCP_METRICS_DIR") or None)
+HTTP_REQUESTS = metrics_registry.counter(
+    "mcp_http_requests_total", "HTTP requests by route and status code", ("route", "status"))
+HTTP_LATENCY = metrics_registry.histogram(
+    "mcp_http_request_duration_seconds", "HTTP request latency by route (time to first byte for streams)", ("route",))
+TOOL_CALLS = metrics_registry.counter(
+    "mcp_tool_calls_total", "Tool calls, single or batched, by tool and status code", ("tool", "status"))
+TOOL_LATENCY = metrics_registry.histogram(
+    "mcp_tool_duration_seconds", "Latency of single tool calls, validation included", ("tool",))
+BATCH_GROUP_LATENCY = metrics_registry.histogram(
+    "mcp_batch_group_duration_seconds", "Latency of one tool's group of calls within a batch", ("tool",))
+CREATIVITY_PHASES = metrics_registry.histogram(
+    "mcp_creativity_phase_seconds",
+    "creativity_score time per phase: chunking (with the lexical counts), inference, stats, feedback",
+    ("phase",))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_REQUESTS.inc(route, str(response.status_code))
+    started = g.get("request_started")
+    if started is not None:
+        HTTP_LATENCY.observe(time.perf_counter() - started, route)
+    return response
+
+# Each tool is a plain function of its params returning (body, status code),
+# so the HTTP routes and the /tools/batch endpoint share the same logic.
+
 # Tool 1: Math operations
-@app.route('/tools/math', methods=['POST'])
-def math_tool():
-    data = request.json
-    operation = data.get('operation')
+def run_math(params):
+    operation = params.get('operation')
     try:
-        a = float(data.get('a', 0))
-        b = float(data.get('b', 0))
-    except ValueError:
-        return jsonify({"status": "error", "message": "Operands must be numbers"}), 400
+        a = float(params.get('a', 0))
+        b = float(params.get('b', 0))
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "Operands must be numbers"}, 400
 
     result = None
     if operation == 'add':
@@ -28,19 +71,50 @@ def math_tool():
         result = a * b
     elif operation == 'divide':
         if b == 0:
-            return jsonify({"status": "error", "message": "Cannot divide by zero"}), 400
+            return {"status": "error", "message": "Cannot divide by zero"}, 400
         result = a / b
     else:
-        return jsonify({"status": "error", "message": f"Unknown operation: {operation}"}), 400
+        return {"status": "error", "message": f"Unknown operation: {operation}"}, 400
 
-    return jsonify({"status": "success", "result": result})
+    return {"status": "success", "result": result}, 200
+
+MATH_UFUNCS = {'add': np.add, 'subtract': np.subtract, 'multiply': np.multiply, 'divide': np.divide}
+
+def run_math_batch(params_list):
+    """Validates every call, then runs each operation as one vectorized NumPy op."""
+    results = [None] * len(params_list)
+    groups = {}
+    for i, params in enumerate(params_list):
+        operation = params.get('operation')
+        try:
+            a = float(params.get('a', 0))
+            b = float(params.get('b', 0))
+        except (TypeError, ValueError):
+            results[i] = ({"status": "error", "message": "Operands must be numbers"}, 400)
+            continue
+        if operation not in MATH_UFUNCS:
+            results[i] = ({"status": "error", "message": f"Unknown operation: {operation}"}, 400)
+        elif operation == 'divide' and b == 0:
+            results[i] = ({"status": "error", "message": "Cannot divide by zero"}, 400)
+        else:
+            groups.setdefault(operation, []).append((i, a, b))
+
+    for operation, calls in groups.items():
+        indices, a, b = zip(*calls)
+        values = MATH_UFUNCS[operation](np.array(a), np.array(b))
+        for i, value in zip(indices, values.tolist()):
+            results[i] = ({"status": "success", "result": value}, 200)
+    return results
+
+@app.route('/tools/math', methods=['POST'])
+def math_tool():
+    body, status = call_tool("math", request.json)
+    return jsonify(body), status
 
 
 # Tool 2: Weather information (simulated)
-@app.route('/tools/weather', methods=['POST'])
-def weather_tool():
-    data = request.json
-    location = data.get('location', '').lower()
+def run_weather(params):
+    location = params.get('location', '').lower()
 
     # Simulate weather data
     weather_data = {
@@ -51,182 +125,535 @@ def weather_tool():
     }
 
     if location in weather_data:
-        return jsonify({
+        return {
             "status": "success",
             "result": weather_data[location]
-        })
+        }, 200
     else:
-        return jsonify({
+        return {
             "status": "success",
             "result": {'temperature': 18, 'condition': 'Unknown location'}
-        })
+        }, 200
+
+@app.route('/tools/weather', methods=['POST'])
+def weather_tool():
+    body, status = call_tool("weather", request.json)
+    return jsonify(body), status
 
 # Tool 3: Date and time
-@app.route('/tools/datetime', methods=['POST'])
-def datetime_tool():
-    data = request.json
-    format_str = data.get('format', '%Y-%m-%d %H:%M:%S')
+def run_datetime(params):
+    format_str = params.get('format', '%Y-%m-%d %H:%M:%S')
 
     try:
         current_time = datetime.now().strftime(format_str)
-        return jsonify({"status": "success", "result": current_time})
+        return {"status": "success", "result": current_time}, 200
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 400
+        return {"status": "error", "message": str(e)}, 400
+
+@app.route('/tools/datetime', methods=['POST'])
+def datetime_tool():
+    body, status = call_tool("datetime", request.json)
+    return jsonify(body), status
+
+# Sentiment analysis pipeline (as a proxy for creativity scoring)
+# In a real implementation, you might use a more sophisticated model.
+# The model is loaded on the first creativity request, or ahead of time by
+# warming it up (SENTIMENT_WARMUP=1, POST /warmup, or running this file).
+# When SENTIMENT_SERVER is set, scoring is sent to a shared inference
+# process (model_server.py) instead of loading the model in this process.
+SENTIMENT_MODEL = os.environ.get("SENTIMENT_MODEL")
+SENTIMENT_WARMUP = os.environ.get("SENTIMENT_WARMUP", "0") == "1"
+SENTIMENT_BACKEND = os.environ.get("SENTIMENT_BACKEND", "pytorch")
+SENTIMENT_THREADS = int(os.environ.get("SENTIMENT_THREADS", "0")) or None
+SENTIMENT_SERVER = os.environ.get("SENTIMENT_SERVER")
+
+if SENTIMENT_SERVER:
+    sentiment_analyzer = RemoteSentimentModel(SENTIMENT_SERVER, authkey_from_env())
+else:
+    sentiment_analyzer = SentimentModel(SENTIMENT_MODEL, SENTIMENT_BACKEND, SENTIMENT_THREADS)
+if SENTIMENT_WARMUP:
+    sentiment_analyzer.warm_up()
 
-# Load sentiment analysis pipeline (as a proxy for creativity scoring)
-# In a real implementation, you might use a more sophisticated model
-sentiment_analyzer = pipeline("sentiment-analysis")
+# Chunks are scored in batches rather than one pipeline call per chunk
+SENTIMENT_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", "32"))
+
+def score_chunks(chunks):
+    return sentiment_analyzer.score(chunks, batch_size=SENTIMENT_BATCH_SIZE)
+
+# Cross-request micro-batching: chunks from concurrent requests share one
+# model call, flushed when the batch is full or the max wait has elapsed.
+# A shared inference process runs its own scheduler across all workers.
+SENTIMENT_SCHEDULER = os.environ.get("SENTIMENT_SCHEDULER", "1") == "1" and not SENTIMENT_SERVER
+SENTIMENT_MAX_BATCH = int(os.environ.get("SENTIMENT_MAX_BATCH", "64"))
+SENTIMENT_MAX_WAIT_MS = float(os.environ.get("SENTIMENT_MAX_WAIT_MS", "10"))
+
+inference_scheduler = MicroBatchScheduler(
+    score_chunks,
+    max_batch_size=SENTIMENT_MAX_BATCH,
+    max_wait_ms=SENTIMENT_MAX_WAIT_MS
+)
+
+def analyze_chunks(chunks):
+    if SENTIMENT_SCHEDULER:
+        return inference_scheduler.score(chunks)
+    return score_chunks(chunks)
+
+# Content-addressed caches: whole results keyed by a hash of the text, and
+# per-chunk sentiment scores so edited drafts only re-score changed chunks.
+# Set CREATIVITY_CACHE_PATH to persist both layers across restarts.
+CREATIVITY_CACHE_SIZE = int(os.environ.get("CREATIVITY_CACHE_SIZE", "1024"))
+CHUNK_CACHE_SIZE = int(os.environ.get("CHUNK_CACHE_SIZE", "65536"))
+CREATIVITY_CACHE_TTL = float(os.environ.get("CREATIVITY_CACHE_TTL", "3600"))
+CREATIVITY_CACHE_PATH = os.environ.get("CREATIVITY_CACHE_PATH")
+
+result_cache = TTLCache(
+    maxsize=CREATIVITY_CACHE_SIZE,
+    ttl=CREATIVITY_CACHE_TTL,
+    path=CREATIVITY_CACHE_PATH,
+    table="creativity_results"
+)
+chunk_cache = TTLCache(
+    maxsize=CHUNK_CACHE_SIZE,
+    ttl=CREATIVITY_CACHE_TTL,
+    path=CREATIVITY_CACHE_PATH,
+    table="chunk_scores"
+)
+
+def text_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def cached_analyze_chunks(chunks, analyze=analyze_chunks):
+    """
+    Returns sentiment scores for the chunks, only sending chunks that are
+    not already in the chunk cache to the model (through analyze).
+    """
+    with CREATIVITY_PHASES.time("inference"):
+        keys = [text_key(chunk) for chunk in chunks]
+        scores = [chunk_cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            fresh = analyze([chunks[i] for i in missing])
+            for i, score in zip(missing, fresh):
+                scores[i] = score
+            chunk_cache.set_many((keys[i], scores[i]) for i in missing)
+    return scores
+
+def diversity_of(sentiment_scores):
+    return np.std(sentiment_scores) if len(sentiment_scores) > 1 else 0.5
+
+def build_feedback(features, sentiment_diversity):
+    """
+    Turns the lexical features and the spread of chunk sentiment scores of
+    one text into the creativity feedback returned by the tool.
+    """
+    # This is a simplified creativity scoring algorithm
+    # Real implementations would use more sophisticated approaches
+
+    # 1. Length factor (longer texts might have more creative elements)
+    length_score = min(features["length"] / 500, 1.0) * 20  # Max 20 points
+
+    # 2. Sentiment diversity (proxy for emotional range)
+    emotion_score = sentiment_diversity * 30  # Max 30 points
+
+    # 3. Vocabulary richness (simple approximation)
+    vocabulary_ratio = features["unique_word_count"] / max(features["word_count"], 1)
+    vocabulary_score = vocabulary_ratio * 25  # Max 25 points
+
+    # 4. Question factor (texts with questions might engage more)
+    question_score = min(features["question_count"] * 5, 15)  # Max 15 points
+
+    # 5. Uncommon punctuation (might indicate creative formatting)
+    punct_score = min(features["uncommon_punct_count"], 10)  # Max 10 points
+
+    # Calculate total score
+    total_score = length_score + emotion_score + vocabulary_score + question_score + punct_score
+    normalized_score = min(round(total_score / 10), 10)  # 0-10 scale
+
+    # Create detailed feedback
+    feedback = {
+        "overall_score": normalized_score,
+        "breakdown": {
+            "length": round(length_score / 20 * 10),
+            "emotional_range": round(emotion_score / 30 * 10),
+            "vocabulary_richness": round(vocabulary_score / 25 * 10),
+            "engagement": round(question_score / 15 * 10),
+            "stylistic_elements": round(punct_score / 10 * 10)
+        },
+        "strengths": [],
+        "improvement_areas": []
+    }
+
+    # Generate feedback points
+    if feedback["breakdown"]["vocabulary_richness"] >= 7:
+        feedback["strengths"].append("Strong vocabulary diversity")
+    elif feedback["breakdown"]["vocabulary_richness"] <= 4:
+        feedback["improvement_areas"].append("Consider using more varied vocabulary")
+
+    if feedback["breakdown"]["emotional_range"] >= 7:
+        feedback["strengths"].append("Good emotional range and depth")
+    elif feedback["breakdown"]["emotional_range"] <= 4:
+        feedback["improvement_areas"].append("Try incorporating more emotional variety")
+
+    if feedback["breakdown"]["length"] <= 3:
+        feedback["improvement_areas"].append("The text might benefit from more development")
+
+    if feedback["breakdown"]["engagement"] >= 7:
+        feedback["strengths"].append("Engaging questioning style")
+
+    return feedback
+
+def score_creativity_batch(texts):
+    """
+    Scores many texts at once: features are extracted in one vectorized
+    pass and every uncached chunk of every text goes to the model together.
+    Returns one feedback dict per text, in order.
+    """
+    keys = [text_key(text) for text in texts]
+    results = [result_cache.get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    with CREATIVITY_PHASES.time("chunking"):
+        features = extract_features_batch([texts[i] for i in pending])
+        all_chunks = [chunk for f in features for chunk in f["chunks"]]
+    all_scores = cached_analyze_chunks(all_chunks)
+
+    # Phase times are summed over the batch and recorded once, like the phases above
+    stats_seconds = feedback_seconds = 0.0
+    offset = 0
+    for i, f in zip(pending, features):
+        n = len(f["chunks"])
+        started = time.perf_counter()
+        sentiment_diversity = diversity_of(all_scores[offset:offset + n])
+        computed = time.perf_counter()
+        feedback = build_feedback(f, sentiment_diversity)
+        stats_seconds += computed - started
+        feedback_seconds += time.perf_counter() - computed
+        offset += n
+        results[i] = feedback
+    result_cache.set_many((keys[i], results[i]) for i in pending)
+    CREATIVITY_PHASES.observe(stats_seconds, "stats")
+    CREATIVITY_PHASES.observe(feedback_seconds, "feedback")
+    return results
 
 # Tool 4: Creativity Evaluator
+def run_creativity_score(params):
+    text = params.get('text', '')
+
+    if not text:
+        return {"status": "error", "message": "No text provided"}, 400
+
+    cache_key = text_key(text)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return {"status": "success", "result": cached}, 200
+
+    try:
+        with CREATIVITY_PHASES.time("chunking"):
+            features = extract_features(text)
+        sentiment_scores = cached_analyze_chunks(features["chunks"])
+        with CREATIVITY_PHASES.time("stats"):
+            sentiment_diversity = diversity_of(sentiment_scores)
+        with CREATIVITY_PHASES.time("feedback"):
+            feedback = build_feedback(features, sentiment_diversity)
+
+        result_cache.set(cache_key, feedback)
+
+        return {
+            "status": "success",
+            "result": feedback
+        }, 200
+    except Exception as e:
+        return {"status": "error", "message": str(e)}, 500
+
+def run_creativity_score_batch(params_list):
+    """Scores every text in the batch with one shared model call."""
+    results = [None] * len(params_list)
+    texts = {}
+    for i, params in enumerate(params_list):
+        text = params.get('text', '')
+        if not text:
+            results[i] = ({"status": "error", "message": "No text provided"}, 400)
+        else:
+            texts[i] = text
+
+    if texts:
+        try:
+            feedbacks = score_creativity_batch(list(texts.values()))
+            for i, feedback in zip(texts, feedbacks):
+                results[i] = ({"status": "success", "result": feedback}, 200)
+        except Exception as e:
+            for i in texts:
+                results[i] = ({"status": "error", "message": str(e)}, 500)
+    return results
+
 @app.route('/tools/creativity_score', methods=['POST'])
 def creativity_score_tool():
-    data = request.json
-    text = data.get('text', '')
+    body, status = call_tool("creativity_score", request.json)
+    return jsonify(body), status
 
-    if not text:
-        return jsonify({"status": "error", "message": "No text provided"}), 400
+TOOL_HANDLERS = {
+    "math": run_math,
+    "weather": run_weather,
+    "datetime": run_datetime,
+    "creativity_score": run_creativity_score,
+}
 
+def call_tool(tool, params):
+    """Validates params against the tool's manifest schema, then runs the tool."""
+    started = time.perf_counter()
     try:
-        # This is a simplified creativity scoring algorithm
-        # Real implementations would use more sophisticated approaches
-
-        # 1. Length factor (longer texts might have more creative elements)
-        length_score = min(len(text) / 500, 1.0) * 20  # Max 20 points
-
-        # 2. Sentiment diversity (proxy for emotional range)
-        chunks = [text[i:i+100] for i in range(0, len(text), 100)]
-        if not chunks:
-            chunks = [text]
-
-        sentiments = [sentiment_analyzer(chunk)[0] for chunk in chunks if chunk.strip()]
-        sentiment_scores = [s['score'] for s in sentiments]
-        sentiment_diversity = np.std(sentiment_scores) if len(sentiment_scores) > 1 else 0.5
-        emotion_score = sentiment_diversity * 30  # Max 30 points
-
-        # 3. Vocabulary richness (simple approximation)
-        words = text.lower().split()
-        unique_words = set(words)
-        vocabulary_ratio = len(unique_words) / max(len(words), 1)
-        vocabulary_score = vocabulary_ratio * 25  # Max 25 points
-
-        # 4. Question factor (texts with questions might engage more)
-        question_count = text.count('?')
-        question_score = min(question_count * 5, 15)  # Max 15 points
-
-        # 5. Uncommon punctuation (might indicate creative formatting)
-        uncommon_punct = sum(1 for char in text if char in '!;:—"\'()[]{}')
-        punct_score = min(uncommon_punct, 10)  # Max 10 points
-
-        # Calculate total score
-        total_score = length_score + emotion_score + vocabulary_score + question_score + punct_score
-        normalized_score = min(round(total_score / 10), 10)  # 0-10 scale
-
-        # Create detailed feedback
-        feedback = {
-            "overall_score": normalized_score,
-            "breakdown": {
-                "length": round(length_score / 20 * 10),
-                "emotional_range": round(emotion_score / 30 * 10),
-                "vocabulary_richness": round(vocabulary_score / 25 * 10),
-                "engagement": round(question_score / 15 * 10),
-                "stylistic_elements": round(punct_score / 10 * 10)
-            },
-            "strengths": [],
-            "improvement_areas": []
-        }
+        params = TOOL_VALIDATORS[tool](params)
+    except ValidationError as e:
+        body, status = {"status": "error", "message": str(e)}, 400
+    else:
+        body, status = TOOL_HANDLERS[tool](params)
+    TOOL_LATENCY.observe(time.perf_counter() - started, tool)
+    TOOL_CALLS.inc(tool, str(status))
+    return body, status
 
-        # Generate feedback points
-        if feedback["breakdown"]["vocabulary_richness"] >= 7:
-            feedback["strengths"].append("Strong vocabulary diversity")
-        elif feedback["breakdown"]["vocabulary_richness"] <= 4:
-            feedback["improvement_areas"].append("Consider using more varied vocabulary")
+# Tools that can process a whole group of calls at once
+BATCH_HANDLERS = {
+    "math": run_math_batch,
+    "creativity_score": run_creativity_score_batch,
+}
 
-        if feedback["breakdown"]["emotional_range"] >= 7:
-            feedback["strengths"].append("Good emotional range and depth")
-        elif feedback["breakdown"]["emotional_range"] <= 4:
-            feedback["improvement_areas"].append("Try incorporating more emotional variety")
+# Bulk tool execution: many {tool, params} calls per HTTP round trip. Calls
+# are grouped by tool so each group runs through its batch handler, and
+# results come back in request order with a per-item status code.
+BATCH_MAX_CALLS = int(os.environ.get("MCP_BATCH_MAX_CALLS", "1000"))
 
-        if feedback["breakdown"]["length"] <= 3:
-            feedback["improvement_areas"].append("The text might benefit from more development")
+def run_batch(calls):
+    results = [None] * len(calls)
+    # Metric label per call; unknown names are not used as labels
+    tool_labels = ["invalid"] * len(calls)
+    groups = {}
+    for i, call in enumerate(calls):
+        if not isinstance(call, dict):
+            results[i] = ({"status": "error", "message": "Each call must be an object with 'tool' and 'params'"}, 400)
+            continue
+        tool = call.get('tool')
+        if tool not in TOOL_HANDLERS:
+            tool_labels[i] = "unknown"
+            results[i] = ({"status": "error", "message": f"Unknown tool: {tool}"}, 404)
+            continue
+        tool_labels[i] = tool
+        try:
+            params = TOOL_VALIDATORS[tool](call.get('params') or {})
+        except ValidationError as e:
+            results[i] = ({"status": "error", "message": str(e)}, 400)
+            continue
+        groups.setdefault(tool, []).append((i, params))
 
-        if feedback["breakdown"]["engagement"] >= 7:
-            feedback["strengths"].append("Engaging questioning style")
+    for tool, group in groups.items():
+        indices = [i for i, _ in group]
+        params_list = [params for _, params in group]
+        with BATCH_GROUP_LATENCY.time(tool):
+            if tool in BATCH_HANDLERS:
+                group_results = BATCH_HANDLERS[tool](params_list)
+            else:
+                group_results = [TOOL_HANDLERS[tool](params) for params in params_list]
+        for i, result in zip(indices, group_results):
+            results[i] = result
 
-        return jsonify({
-            "status": "success",
-            "result": feedback
-        })
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+    for tool, (_, status) in zip(tool_labels, results):
+        TOOL_CALLS.inc(tool, str(status))
+    return [dict(body, status_code=status) for body, status in results]
 
-# MCP Tool Manifest
-@app.route('/manifest', methods=['GET'])
-def manifest():
+@app.route('/tools/batch', methods=['POST'])
+def batch_tool():
+    data = request.json
+    calls = data.get('calls') if isinstance(data, dict) else data
+    if not isinstance(calls, list):
+        return jsonify({"status": "error", "message": "Expected a list of {tool, params} calls"}), 400
+    if len(calls) > BATCH_MAX_CALLS:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_CALLS} calls per batch"}), 413
+
+    return jsonify({"status": "success", "results": run_batch(calls)})
+
+# Streaming creativity scoring for very long documents. The body is read
+# incrementally, either as raw text or as NDJSON lines of {"text": "..."},
+# and partial scores are sent back as server-sent events while it arrives.
+STREAM_READ_SIZE = int(os.environ.get("CREATIVITY_STREAM_READ_SIZE", "8192"))
+STREAM_FLUSH_CHUNKS = int(os.environ.get("CREATIVITY_STREAM_FLUSH_CHUNKS", "8"))
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def iter_request_text(stream, ndjson):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ""
+    while True:
+        block = stream.read(STREAM_READ_SIZE)
+        text = decoder.decode(block, final=not block)
+        if ndjson:
+            pending += text
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line).get('text', '')
+        elif text:
+            yield text
+        if not block:
+            break
+    if ndjson and pending.strip():
+        yield json.loads(pending).get('text', '')
+
+@app.route('/tools/creativity_score/stream', methods=['POST'])
+def creativity_score_stream():
+    ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+    stream = request.stream
+
+    def score(accumulator, chunks):
+        for i in range(0, len(chunks), STREAM_FLUSH_CHUNKS):
+            # Flush groups are far below SENTIMENT_MAX_BATCH, so going through
+            # the scheduler would add its full max wait to every group
+            accumulator.add_scores(cached_analyze_chunks(chunks[i:i + STREAM_FLUSH_CHUNKS], score_chunks))
+            yield sse_event("partial", {
+                "chunks_scored": accumulator.scored,
+                "characters": accumulator.length,
+                "result": build_feedback(accumulator.features(), accumulator.sentiment_diversity)
+            })
+
+    def generate():
+        accumulator = StreamingFeatures()
+        digest = hashlib.sha256()
+        try:
+            for piece in iter_request_text(stream, ndjson):
+                digest.update(piece.encode('utf-8'))
+                yield from score(accumulator, accumulator.feed(piece))
+            yield from score(accumulator, accumulator.finish())
+
+            if not accumulator.length:
+                yield sse_event("error", {"status": "error", "message": "No text provided"})
+                return
+
+            feedback = build_feedback(accumulator.features(), accumulator.sentiment_diversity)
+            result_cache.set(digest.hexdigest(), feedback)
+            yield sse_event("result", {"status": "success", "result": feedback})
+        except Exception as e:
+            yield sse_event("error", {"status": "error", "message": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+# Readiness: cheap tools are always available, creativity_score once the model is loaded
+@app.route('/ready', methods=['GET'])
+def ready():
+    model_status = sentiment_analyzer.status()
+    status_code = 200 if sentiment_analyzer.ready else 503
     return jsonify({
-        "schema_version": "v1",
-        "tools": [
-            {
-                "name": "math",
-                "description": "Perform basic math operations",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "operation": {
-                            "type": "string",
-                            "enum": ["add", "subtract", "multiply", "divide"],
-                            "description": "The math operation to perform"
-                        },
-                        "a": {"type": "number", "description": "First operand"},
-                        "b": {"type": "number", "description": "Second operand"}
-                    },
-                    "required": ["operation", "a", "b"]
-                }
-            },
-            {
-                "name": "weather",
-                "description": "Get weather information for a location",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "location": {
-                            "type": "string",
-                            "description": "The location to get weather for"
-                        }
-                    },
-                    "required": ["location"]
-                }
-            },
-            {
-                "name": "datetime",
-                "description": "Get current date and time",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "format": {
-                            "type": "string",
-                            "description": "datetime format string (e.g., %Y-%m-%d %H:%M:%S)",
-                            "default": "%Y-%m-%d %H:%M:%S"
-                        }
-                    },
-                    "required": []
-                }
-            },
-            {
-                "name": "creativity_score",
-                "description": "Evaluate the creativity level of a text on a scale of 0-10",
-                "input_schema": {
-                    "type": "object",
-                    "properties": {
-                        "text": {
-                            "type": "string",
-                            "description": "The text to evaluate for creativity"
-                        }
+        "status": "ready" if sentiment_analyzer.ready else "warming",
+        "model": model_status
+    }), status_code
+
+@app.route('/warmup', methods=['POST'])
+def warmup():
+    if sentiment_analyzer.state in ("cold", "failed"):
+        sentiment_analyzer.warm_up()
+    return jsonify({"status": "success", "model": sentiment_analyzer.status()}), 202
+
+# Creativity cache statistics
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "results": result_cache.stats(),
+        "chunks": chunk_cache.stats()
+    })
+
+# MCP Tool Manifest
+MANIFEST = {
+    "schema_version": "v1",
+    "batch_endpoint": {"path": "/tools/batch", "max_calls": BATCH_MAX_CALLS},
+    "tools": [
+        {
+            "name": "math",
+            "description": "Perform basic math operations",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "operation": {
+                        "type": "string",
+                        "enum": ["add", "subtract", "multiply", "divide"],
+                        "description": "The math operation to perform"
                     },
-                    "required": ["text"]
-                }
+                    "a": {"type": "number", "description": "First operand"},
+                    "b": {"type": "number", "description": "Second operand"}
+                },
+                "required": ["operation", "a", "b"]
             }
-        ]
-    })
+        },
+        {
+            "name": "weather",
+            "description": "Get weather information for a location",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "location": {
+                        "type": "string",
+                        "description": "The location to get weather for"
+                    }
+                },
+                "required": ["location"]
+            }
+        },
+        {
+            "name": "datetime",
+            "description": "Get current date and time",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "format": {
+                        "type": "string",
+                        "description": "datetime format string (e.g., %Y-%m-%d %H:%M:%S)",
+                        "default": "%Y-%m-%d %H:%M:%S"
+                    }
+                },
+                "required": []
+            }
+        },
+        {
+            "name": "creativity_score",
+            "description": "Evaluate the creativity level of a text on a scale of 0-10",
+            "input_schema": {
+                "type": "object",
+                "properties": {
+                    "text": {
+                        "type": "string",
+                        "description": "The text to evaluate for creativity"
+                    }
+                },
+                "required": ["text"]
+            }
+        }
+    ]
+}
+
+# Argument validators compiled once from the manifest's input schemas
+TOOL_VALIDATORS = compile_validators(MANIFEST)
+
+# The manifest only changes on deploy, so it is serialized once and served
+# with an ETag; clients revalidate with If-None-Match and get a 304.
+MANIFEST_JSON = json.dumps(MANIFEST).encode('utf-8')
+MANIFEST_ETAG = hashlib.sha256(MANIFEST_JSON).hexdigest()[:16]
+MANIFEST_MAX_AGE = int(os.environ.get("MCP_MANIFEST_MAX_AGE", "60"))
+
+@app.route('/manifest', methods=['GET'])
+def manifest():
+    response = Response(MANIFEST_JSON, mimetype='application/json')
+    response.set_etag(MANIFEST_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = MANIFEST_MAX_AGE
+    return response.make_conditional(request)
 
 if __name__ == "__main__":
+    sentiment_analyzer.warm_up()
     app.run(debug=True, port=5001)
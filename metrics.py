@@ -0,0 +1,209 @@
+"""
+In-process counters and histograms, rendered in the Prometheus text
+exposition format.
+
+Each metric keeps plain per-label-set values behind its own lock, so
+recording costs a dict lookup and a bisect and can stay on in production.
+Values are per process. With a shared directory (MCP_METRICS_DIR), every
+process also writes its values to a file there about once a second, and
+/metrics sums the files, so any gunicorn worker reports the totals of all
+of them.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from cheap tools (sub-millisecond) to long creativity texts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(label_values), value] for label_values, value in self._values.items()]
+
+    def merge(self, snapshots):
+        values = {}
+        for snapshot in snapshots:
+            for label_values, value in snapshot:
+                key = tuple(label_values)
+                values[key] = values.get(key, 0) + value
+        return values
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        if values is None:
+            with self._lock:
+                values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(label_values), list(counts), total, count] for label_values, (counts, total, count) in self._values.items()]
+
+    def merge(self, snapshots):
+        values = {}
+        for snapshot in snapshots:
+            for label_values, counts, total, count in snapshot:
+                entry = values.setdefault(tuple(label_values), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+        return values
+
+    def render(self, values=None):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        if values is None:
+            with self._lock:
+                values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        items = sorted(values.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = (("le", _number(bound)),)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    directory enables multi-process mode: values are shared through one
+    JSON file per process. Files of exited processes are kept, so counters
+    never go backwards; clear the directory when the server (re)starts.
+    """
+
+    def __init__(self, directory=None, interval=1.0):
+        self.metrics = []
+        self.directory = directory
+        self.interval = interval
+        self._path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._start_writer()
+            # Threads don't survive fork: each gunicorn worker starts its own
+            os.register_at_fork(after_in_child=self._start_writer)
+
+    def _start_writer(self):
+        # Start time in the name, so a recycled pid never overwrites a dead worker's file
+        self._path = os.path.join(self.directory, f"metrics-{os.getpid()}-{time.time_ns()}.json")
+
+        def _write_forever(path):
+            while self._path == path:
+                time.sleep(self.interval)
+                self.write()
+
+        threading.Thread(target=_write_forever, args=(self._path,), name="metrics-writer", daemon=True).start()
+
+    def write(self):
+        """Writes this process's values to its file in the shared directory."""
+        if not self._path:
+            return
+        data = {metric.name: metric.snapshot() for metric in self.metrics}
+        try:
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path)
+        except OSError:
+            pass
+
+    def _read_all(self):
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Unreadable, or removed since the glob: leave it out of this scrape
+                continue
+        return snapshots
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        snapshots = None
+        if self.directory:
+            self.write()
+            snapshots = self._read_all()
+        lines = []
+        for metric in self.metrics:
+            if snapshots is None:
+                lines.extend(metric.render())
+            else:
+                lines.extend(metric.render(metric.merge(s.get(metric.name, []) for s in snapshots)))
+        return "\n".join(lines) + "\n"
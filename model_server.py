@@ -0,0 +1,152 @@
+"""
+Dedicated inference process for the creativity tool.
+
+The sentiment model is loaded once here and shared by every web worker.
+Workers send scoring jobs over a local IPC connection, and chunks from all
+workers are micro-batched together before they reach the model.
+
+    export SENTIMENT_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python model_server.py                          # terminal 1
+    SENTIMENT_SERVER=127.0.0.1:6001 gunicorn -w 8 mcp_server:app   # terminal 2
+
+Connections are pickled, so both sides must share a secret key; there is
+no default.
+"""
+import os
+import threading
+from multiprocessing.managers import BaseManager
+
+from batching import MicroBatchScheduler
+from sentiment_model import SentimentModel
+
+
+def parse_address(value):
+    """'host:port' becomes a TCP address, anything else a Unix socket path."""
+    host, _, port = value.rpartition(":")
+    if host and port.isdigit():
+        return (host, int(port))
+    return value
+
+
+def authkey_from_env():
+    """The shared key from SENTIMENT_SERVER_AUTHKEY; refuses to run without one."""
+    authkey = os.environ.get("SENTIMENT_SERVER_AUTHKEY")
+    if not authkey:
+        raise EnvironmentError(
+            "SENTIMENT_SERVER_AUTHKEY not set. Set it to the same secret for model_server.py and the web workers."
+        )
+    return authkey.encode()
+
+
+class ModelManager(BaseManager):
+    pass
+
+
+class ScoringService:
+    def __init__(self, model, batch_size=32, max_batch_size=64, max_wait_ms=10):
+        self.model = model
+        self.batch_size = batch_size
+        self.scheduler = MicroBatchScheduler(
+            self._score,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+
+    def _score(self, chunks):
+        return self.model.score(chunks, batch_size=self.batch_size)
+
+    def score(self, chunks):
+        return self.scheduler.score(chunks)
+
+    def status(self):
+        return self.model.status()
+
+
+class RemoteSentimentModel:
+    """
+    Client side of the inference process, with the same interface as
+    SentimentModel. Proxies open one connection per calling thread.
+    """
+
+    def __init__(self, address, authkey):
+        self.address = parse_address(address)
+        self.authkey = authkey.encode() if isinstance(authkey, str) else authkey
+        self._service = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    ModelManager.register("get_service")
+                    manager = ModelManager(address=self.address, authkey=self.authkey)
+                    manager.connect()
+                    self._service = manager.get_service()
+        return self._service
+
+    def score(self, chunks, batch_size=None):
+        if not chunks:
+            return []
+        try:
+            return self._connect().score(list(chunks))
+        except (ConnectionError, EOFError):
+            # Inference process restarted; reconnect once
+            self._service = None
+            return self._connect().score(list(chunks))
+
+    def warm_up(self, background=True):
+        # The inference process owns the model; just open the connection
+        try:
+            self._connect()
+        except (ConnectionError, OSError):
+            pass
+
+    @property
+    def state(self):
+        return self.status()["state"]
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        try:
+            return self._connect().status()
+        except (ConnectionError, OSError, EOFError) as e:
+            self._service = None
+            return {"state": "unreachable", "model": None, "load_seconds": None, "error": str(e)}
+
+
+def serve():
+    address = parse_address(os.environ.get("SENTIMENT_SERVER", "127.0.0.1:6001"))
+    authkey = authkey_from_env()
+
+    model = SentimentModel(
+        os.environ.get("SENTIMENT_MODEL"),
+        os.environ.get("SENTIMENT_BACKEND", "pytorch"),
+        int(os.environ.get("SENTIMENT_THREADS", "0")) or None
+    )
+    model.warm_up(background=False)
+    service = ScoringService(
+        model,
+        batch_size=int(os.environ.get("SENTIMENT_BATCH_SIZE", "32")),
+        max_batch_size=int(os.environ.get("SENTIMENT_MAX_BATCH", "64")),
+        max_wait_ms=float(os.environ.get("SENTIMENT_MAX_WAIT_MS", "10"))
+    )
+
+    ModelManager.register("get_service", callable=lambda: service)
+    manager = ModelManager(address=address, authkey=authkey)
+    # A Unix socket is created readable only by this user; the umask is
+    # restored as soon as it exists
+    previous_umask = os.umask(0o177) if isinstance(address, str) else None
+    try:
+        server = manager.get_server()
+    finally:
+        if previous_umask is not None:
+            os.umask(previous_umask)
+    print(f"Sentiment inference server listening on {address}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,99 @@
+"""
+Prompt sections describing the MCP tools, rendered once per manifest version.
+
+The tool documentation that goes into every LLM prompt only changes when
+the manifest does, so it is built from a ToolIndex the first time it is
+needed and reused for every later turn. Token counts are kept alongside,
+to watch prompt size as the tool catalog grows.
+"""
+import json
+import threading
+import weakref
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """
+    Token count with tiktoken's cl100k_base encoding when it is installed,
+    otherwise the usual ~4 characters per token estimate.
+    """
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def render_tool_doc(description, input_schema, required):
+    """A tool's description followed by one line per argument."""
+    properties = input_schema.get("properties")
+    if not properties:
+        return f"{description}\n\n"
+
+    lines = ["Arguments (in JSON format):"]
+    for prop_name, prop_details in properties.items():
+        requirement = "REQUIRED" if prop_name in required else "optional"
+        prop_type = prop_details.get("type", "any")
+        prop_description = prop_details.get("description", "")
+        default = f", default: {prop_details['default']}" if "default" in prop_details else ""
+        lines.append(f"- {prop_name} ({prop_type}, {requirement}{default}): {prop_description}")
+    return f"{description}\n\n" + "\n".join(lines) + "\n"
+
+
+class PromptSections:
+    def __init__(self, index):
+        self.tool_docs = {
+            name: render_tool_doc(index.tools[name].get("description", ""), index.schemas[name], index.required[name])
+            for name in index.names
+        }
+        # "- name: doc" lines, as used by the chat app's tool selection prompt
+        self.tool_list = "\n".join(f"- {name}: {doc}" for name, doc in self.tool_docs.items())
+        # JSON tool list, as used by the zero-agent client
+        self.tool_json = json.dumps([
+            {
+                "name": name,
+                "description": index.tools[name].get("description", ""),
+                "params": index.schemas[name].get("properties", {})
+            }
+            for name in index.names
+        ], indent=2)
+        self._rendered = {}
+
+    def cached(self, key, render):
+        """Memoizes a caller-specific prompt fragment for this manifest version."""
+        if key not in self._rendered:
+            self._rendered[key] = render(self)
+        return self._rendered[key]
+
+    def stats(self):
+        return {
+            "tools": len(self.tool_docs),
+            "tool_list_tokens": count_tokens(self.tool_list),
+            "tool_json_tokens": count_tokens(self.tool_json),
+            "tool_doc_tokens": {name: count_tokens(doc) for name, doc in self.tool_docs.items()},
+            "rendered_tokens": {key: count_tokens(text) for key, text in self._rendered.items()},
+        }
+
+
+_sections = weakref.WeakKeyDictionary()
+_sections_lock = threading.Lock()
+
+
+def prompt_sections(index):
+    """Returns the PromptSections for a ToolIndex, rendering them on first use."""
+    sections = _sections.get(index)
+    if sections is None:
+        with _sections_lock:
+            sections = _sections.get(index)
+            if sections is None:
+                sections = _sections[index] = PromptSections(index)
+    return sections
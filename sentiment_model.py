@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+
+# Model the transformers "sentiment-analysis" pipeline uses by default. The
+# ONNX backend needs an explicit name to export.
+DEFAULT_MODEL = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+
+# pytorch:   full-precision transformers pipeline
+# quantized: same model with dynamic int8 quantization of the Linear layers
+# onnx:      model exported to ONNX and run with onnxruntime
+#            (needs `pip install optimum[onnxruntime]`)
+# stub:      deterministic scores without a model, for offline benchmarks
+#            (SENTIMENT_STUB_MS adds a simulated cost per text)
+BACKENDS = ("pytorch", "quantized", "onnx", "stub")
+
+STUB_SECONDS_PER_TEXT = float(os.environ.get("SENTIMENT_STUB_MS", "0")) / 1000
+
+
+def stub_pipeline(texts, **kwargs):
+    """Same output shape as the transformers pipeline, with scores derived from a hash of each text."""
+    if isinstance(texts, str):
+        texts = [texts]
+    if STUB_SECONDS_PER_TEXT:
+        time.sleep(STUB_SECONDS_PER_TEXT * len(texts))
+    results = []
+    for text in texts:
+        digest = zlib.crc32(text.encode("utf-8"))
+        results.append({
+            "label": "POSITIVE" if digest & 1 else "NEGATIVE",
+            "score": 0.5 + (digest % 5000) / 10000
+        })
+    return results
+
+
+class SentimentModel:
+    """
+    Sentiment pipeline that is only built on first use, or ahead of time via
+    warm_up(). transformers and torch are not imported until then, so the
+    cheap tools and /manifest are served without waiting on the model.
+    """
+
+    def __init__(self, model_name=None, backend="pytorch", num_threads=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown sentiment backend: {backend} (expected one of {', '.join(BACKENDS)})")
+        self.model_name = model_name
+        self.backend = backend
+        self.num_threads = num_threads
+        self.state = "cold"  # cold -> loading -> ready | failed
+        self.error = None
+        self.load_seconds = None
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._pipeline is not None:
+            return self._pipeline
+        with self._lock:
+            if self._pipeline is not None:
+                return self._pipeline
+            self.state = "loading"
+            started = time.perf_counter()
+            try:
+                self._pipeline = self._build_pipeline()
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                raise
+            self.load_seconds = time.perf_counter() - started
+            self.state = "ready"
+            self.error = None
+        return self._pipeline
+
+    def _build_pipeline(self):
+        if self.backend == "stub":
+            return stub_pipeline
+
+        import torch
+        from transformers import pipeline
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+
+        if self.backend == "onnx":
+            try:
+                import onnxruntime
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+            except ImportError as e:
+                raise ImportError("The onnx backend requires `pip install optimum[onnxruntime]`") from e
+            from transformers import AutoTokenizer
+
+            model_name = self.model_name or DEFAULT_MODEL
+            session_options = onnxruntime.SessionOptions()
+            if self.num_threads:
+                session_options.intra_op_num_threads = self.num_threads
+            model = ORTModelForSequenceClassification.from_pretrained(
+                model_name, export=True, session_options=session_options
+            )
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+        kwargs = {"model": self.model_name} if self.model_name else {}
+        sentiment_pipeline = pipeline("sentiment-analysis", **kwargs)
+        if self.backend == "quantized":
+            sentiment_pipeline.model = torch.quantization.quantize_dynamic(
+                sentiment_pipeline.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        return sentiment_pipeline
+
+    def warm_up(self, background=True):
+        if not background:
+            self.load()
+            return None
+
+        def _load():
+            try:
+                self.load()
+            except Exception:
+                # The failure is recorded in self.state / self.error
+                pass
+
+        thread = threading.Thread(target=_load, name="sentiment-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        return {
+            "state": self.state,
+            "model": self.model_name or "default",
+            "backend": self.backend,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+    def score(self, chunks, batch_size=32):
+        """
+        Scores every chunk with a single batched pipeline call and returns
+        the sentiment score of each chunk, in order.
+        """
+        if not chunks:
+            return []
+        results = self.load()(
+            chunks,
+            batch_size=batch_size,
+            padding=True,
+            truncation=True
+        )
+        return [r['score'] for r in results]
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+
+def compare_backends(reference, candidate, texts, batch_size=32):
+    """
+    Scores the same texts with two models and reports how far the
+    candidate's scores drift from the reference.
+    """
+    ref = reference.load()(texts, batch_size=batch_size, padding=True, truncation=True)
+    cand = candidate.load()(texts, batch_size=batch_size, padding=True, truncation=True)
+    drifts = [abs(r['score'] - c['score']) for r, c in zip(ref, cand)]
+    agreement = sum(r['label'] == c['label'] for r, c in zip(ref, cand))
+    return {
+        "samples": len(texts),
+        "max_abs_drift": max(drifts) if drifts else 0.0,
+        "mean_abs_drift": sum(drifts) / len(drifts) if drifts else 0.0,
+        "label_agreement": agreement / len(texts) if texts else 1.0,
+    }
+
+
+SAMPLE_TEXTS = [
+    "What a wonderful, surprising idea!",
+    "The meeting was postponed again; nobody knows why.",
+    "I can't believe how bad this turned out.",
+    "Rain drummed on the tin roof while the kettle sang.",
+    "Is there anything more thrilling than a blank page?",
+    "The report is due on Friday.",
+]
+
+
+if __name__ == "__main__":
+    # Accuracy-parity check of a faster backend against the default pipeline:
+    #   python sentiment_model.py --backend quantized --max-drift 0.05 [texts.txt]
+    parser = argparse.ArgumentParser(description="Compare a sentiment backend against the pytorch pipeline")
+    parser.add_argument("texts", nargs="?", help="File with one sample text per line")
+    parser.add_argument("--backend", choices=("quantized", "onnx"), default="quantized")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max-drift", type=float, default=0.05,
+                        help="Fail if any score moves further than this from the reference")
+    args = parser.parse_args()
+
+    texts = SAMPLE_TEXTS
+    if args.texts:
+        with open(args.texts) as f:
+            texts = [line.strip()[:100] for line in f if line.strip()]
+
+    reference = SentimentModel(args.model or DEFAULT_MODEL, "pytorch", args.threads)
+    candidate = SentimentModel(args.model or DEFAULT_MODEL, args.backend, args.threads)
+    report = compare_backends(reference, candidate, texts)
+    report["backend"] = args.backend
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["max_abs_drift"] <= args.max_drift else 1)
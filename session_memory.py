@@ -0,0 +1,108 @@
+"""
+Per-session conversation memory for the LangChain agent.
+
+Each session keeps its latest turns verbatim within a token budget; when
+the budget is exceeded, the oldest turns are folded into a running summary
+written by the LLM. Sessions live in a TTLCache, so idle ones expire, the
+least recently used are evicted when the store is full, and a path
+persists them to SQLite.
+"""
+import threading
+import zlib
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from prompt_builder import count_tokens
+from ttl_cache import TTLCache
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation below, extending the current summary. "
+    "Be concise, but keep facts, names and numbers the user may refer back to.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New lines of conversation:\n{lines}\n\n"
+    "New summary:"
+)
+
+
+class SessionMemory:
+    """
+    summarize takes a prompt and returns the summary text; without it,
+    turns that fall out of the window are dropped.
+    """
+
+    def __init__(self, summarize=None, max_tokens=2000, store=None, maxsize=1000, ttl=3600, path=None):
+        self.store = store or TTLCache(maxsize=maxsize, ttl=ttl, path=path, table="chat_sessions")
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.summaries = 0
+        self.summary_failures = 0
+        # Turns for one session are recorded one at a time
+        self._locks = [threading.Lock() for _ in range(64)]
+
+    def _lock(self, session_id):
+        return self._locks[zlib.crc32(session_id.encode("utf-8")) % len(self._locks)]
+
+    def history(self, session_id):
+        """The session's summary and recent turns as LangChain messages."""
+        state = self.store.get(session_id)
+        if not state:
+            return []
+        messages = []
+        if state["summary"]:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{state['summary']}"))
+        for user_text, ai_text, _ in state["turns"]:
+            messages.append(HumanMessage(content=user_text))
+            messages.append(AIMessage(content=ai_text))
+        return messages
+
+    def add_turn(self, session_id, user_text, ai_text):
+        with self._lock(session_id):
+            state = self.store.get(session_id) or {"summary": "", "turns": []}
+            summary = state["summary"]
+            turns = state["turns"] + [[user_text, ai_text, count_tokens(user_text) + count_tokens(ai_text)]]
+
+            total = count_tokens(summary) + sum(turn[2] for turn in turns)
+            if total > self.max_tokens:
+                # Keep recent turns within half the budget, so the next few
+                # turns fit without summarizing again
+                kept, used = 0, 0
+                for turn in reversed(turns):
+                    if used + turn[2] > self.max_tokens // 2:
+                        break
+                    kept += 1
+                    used += turn[2]
+                folded, recent = turns[:len(turns) - kept], turns[len(turns) - kept:]
+                summary = self._fold(summary, folded)
+                if summary is None:
+                    # Summarizing failed: retry next turn, but never hold more
+                    # than twice the budget
+                    summary = state["summary"]
+                    if total <= 2 * self.max_tokens:
+                        recent = turns
+                turns = recent
+
+            self.store.set(session_id, {"summary": summary, "turns": turns})
+
+    def _fold(self, summary, turns):
+        if self.summarize is None:
+            return summary
+        lines = "\n".join(f"Human: {user_text}\nAI: {ai_text}" for user_text, ai_text, _ in turns)
+        try:
+            summary = self.summarize(SUMMARY_PROMPT.format(summary=summary or "(none)", lines=lines))
+        except Exception:
+            self.summary_failures += 1
+            return None
+        self.summaries += 1
+        return summary.strip()
+
+    def clear(self, session_id):
+        with self._lock(session_id):
+            self.store.set(session_id, {"summary": "", "turns": []})
+
+    def stats(self):
+        return dict(
+            self.store.stats(),
+            max_tokens=self.max_tokens,
+            summaries=self.summaries,
+            summary_failures=self.summary_failures
+        )
@@ -0,0 +1,183 @@
+import numpy as np
+
+CHUNK_SIZE = 100
+UNCOMMON_PUNCT = '!;:—"\'()[]{}'
+
+# Codepoint lookup tables, so each feature is one vectorized gather over the
+# text instead of a Python loop per character
+_MAX_CODEPOINT = 0x110000
+_PUNCT_LUT = np.zeros(_MAX_CODEPOINT, dtype=np.bool_)
+_PUNCT_LUT[[ord(c) for c in UNCOMMON_PUNCT]] = True
+# Every character str.isspace() accepts is below U+3001
+_SPACE_LUT = np.zeros(_MAX_CODEPOINT, dtype=np.bool_)
+_SPACE_LUT[[c for c in range(0x3001) if chr(c).isspace()]] = True
+_QUESTION = ord('?')
+
+
+def _codepoints(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+def _chunk_starts(length, chunk_size):
+    return np.arange(0, length, chunk_size)
+
+
+def _features(text, question_count, punct_count, non_empty, chunk_size):
+    words = text.lower().split()
+    starts = _chunk_starts(len(text), chunk_size)
+    return {
+        "length": len(text),
+        "word_count": len(words),
+        "unique_word_count": len(set(words)),
+        "question_count": int(question_count),
+        "uncommon_punct_count": int(punct_count),
+        # Only chunks with some non-whitespace content are scored
+        "chunks": [text[i:i + chunk_size] for i in starts[non_empty]],
+    }
+
+
+def extract_features(text, chunk_size=CHUNK_SIZE):
+    """
+    Computes every lexical feature creativity_score needs from a single
+    codepoint buffer: length, word counts, question marks, uncommon
+    punctuation and the non-blank 100-char chunks to send to the model.
+    """
+    if not text:
+        return _features(text, 0, 0, np.zeros(0, dtype=np.bool_), chunk_size)
+
+    codes = _codepoints(text)
+    non_space = ~_SPACE_LUT[codes]
+    non_empty = np.add.reduceat(non_space, _chunk_starts(len(codes), chunk_size)) > 0
+    return _features(
+        text,
+        np.count_nonzero(codes == _QUESTION),
+        np.count_nonzero(_PUNCT_LUT[codes]),
+        non_empty,
+        chunk_size
+    )
+
+
+def extract_features_batch(texts, chunk_size=CHUNK_SIZE):
+    """
+    Same as extract_features for many texts at once. All texts are joined
+    into one codepoint buffer and the per-text counts are segment sums.
+    """
+    texts = list(texts)
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    if not lengths.sum():
+        return [extract_features(t, chunk_size) for t in texts]
+
+    codes = _codepoints("".join(texts))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Segment boundaries: the start of every chunk of every non-empty text
+    chunk_starts = [_chunk_starts(n, chunk_size) + offset for n, offset in zip(lengths, offsets) if n]
+    chunk_counts = [len(starts) for starts in chunk_starts]
+    chunk_starts = np.concatenate(chunk_starts)
+
+    non_empty = np.add.reduceat(~_SPACE_LUT[codes], chunk_starts) > 0
+    questions = np.add.reduceat(codes == _QUESTION, chunk_starts)
+    punct = np.add.reduceat(_PUNCT_LUT[codes], chunk_starts)
+
+    features = []
+    position = 0
+    counts = iter(chunk_counts)
+    for text in texts:
+        if not text:
+            features.append(extract_features(text, chunk_size))
+            continue
+        n = next(counts)
+        segment = slice(position, position + n)
+        position += n
+        features.append(_features(
+            text,
+            questions[segment].sum(),
+            punct[segment].sum(),
+            non_empty[segment],
+            chunk_size
+        ))
+    return features
+
+
+class StreamingFeatures:
+    """
+    Running version of extract_features for text that arrives in pieces.
+    Only the current partial chunk and trailing word fragment are kept, plus
+    the unique-word set; sentiment scores are folded into a Welford mean and
+    variance as they come back from the model.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.length = 0
+        self.word_count = 0
+        self.unique_words = set()
+        self.question_count = 0
+        self.uncommon_punct_count = 0
+        self._window = ""
+        self._word = ""
+        # Welford accumulators for the sentiment scores
+        self.scored = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def feed(self, text):
+        """Adds a piece of text and returns the chunks it completed."""
+        if not text:
+            return []
+        self.length += len(text)
+        codes = _codepoints(text)
+        self.question_count += int(np.count_nonzero(codes == _QUESTION))
+        self.uncommon_punct_count += int(np.count_nonzero(_PUNCT_LUT[codes]))
+
+        # A word may continue into the next piece, so hold back the last one
+        words = (self._word + text).split()
+        self._word = ""
+        if words and not text[-1].isspace():
+            self._word = words.pop()
+        self._add_words(words)
+
+        buffer = self._window + text
+        complete = len(buffer) - len(buffer) % self.chunk_size
+        self._window = buffer[complete:]
+        return [
+            buffer[i:i + self.chunk_size]
+            for i in range(0, complete, self.chunk_size)
+            if buffer[i:i + self.chunk_size].strip()
+        ]
+
+    def finish(self):
+        """Flushes the trailing word and returns the final partial chunk."""
+        if self._word:
+            self._add_words([self._word])
+            self._word = ""
+        window, self._window = self._window, ""
+        return [window] if window.strip() else []
+
+    def _add_words(self, words):
+        self.word_count += len(words)
+        self.unique_words.update(word.lower() for word in words)
+
+    def add_scores(self, scores):
+        for score in scores:
+            self.scored += 1
+            delta = score - self._mean
+            self._mean += delta / self.scored
+            self._m2 += delta * (score - self._mean)
+
+    @property
+    def sentiment_diversity(self):
+        # Population std, as np.std; a single score falls back to 0.5
+        if self.scored > 1:
+            return float(np.sqrt(self._m2 / self.scored))
+        return 0.5
+
+    def features(self):
+        return {
+            "length": self.length,
+            "word_count": self.word_count,
+            "unique_word_count": len(self.unique_words),
+            "question_count": self.question_count,
+            "uncommon_punct_count": self.uncommon_punct_count,
+            "chunks": [],
+        }
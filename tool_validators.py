@@ -0,0 +1,119 @@
+"""
+Validators compiled from the input_schema entries of the MCP manifest.
+
+compile_validator turns one schema into a function that checks and coerces
+a params dict in a single pass over precomputed field rules, so the same
+manifest validates arguments on the client (before any request is sent)
+and on the server (before a tool runs). Only the JSON Schema subset the
+manifest uses is supported: object properties with a type, enum, default
+and a required list.
+"""
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def _to_string(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError
+
+
+def _to_number(value):
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        return float(value)
+    raise TypeError
+
+
+def _to_integer(value):
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return int(value)
+    raise TypeError
+
+
+def _to_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    raise TypeError
+
+
+def _instance_of(kind):
+    def check(value):
+        if isinstance(value, kind):
+            return value
+        raise TypeError
+    return check
+
+
+COERCERS = {
+    "string": _to_string,
+    "number": _to_number,
+    "integer": _to_integer,
+    "boolean": _to_boolean,
+    "array": _instance_of(list),
+    "object": _instance_of(dict),
+}
+
+
+def compile_validator(input_schema):
+    """
+    Returns a function that takes a params dict and returns a coerced copy
+    with defaults filled in, or raises ValidationError.
+    """
+    required = tuple(input_schema.get("required", []))
+    rules = []
+    for name, prop in input_schema.get("properties", {}).items():
+        prop_type = prop.get("type")
+        coerce = COERCERS.get(prop_type)
+        enum = frozenset(prop["enum"]) if "enum" in prop else None
+        rules.append((name, prop_type, coerce, enum, prop.get("default"), "default" in prop))
+
+    def validate(params):
+        if not isinstance(params, dict):
+            raise ValidationError("Arguments must be a JSON object")
+        missing = [name for name in required if name not in params]
+        if missing:
+            raise ValidationError(f"Missing required argument(s): {', '.join(missing)}")
+
+        result = dict(params)
+        for name, prop_type, coerce, enum, default, has_default in rules:
+            if name not in result:
+                if has_default:
+                    result[name] = default
+                continue
+            value = result[name]
+            if coerce is not None:
+                try:
+                    value = coerce(value)
+                except (TypeError, ValueError):
+                    raise ValidationError(f"Invalid value for '{name}': expected {prop_type}, got {value!r}")
+            if enum is not None and value not in enum:
+                raise ValidationError(
+                    f"Invalid value for '{name}': {value!r} is not one of {', '.join(map(str, sorted(enum)))}"
+                )
+            result[name] = value
+        return result
+
+    return validate
+
+
+def compile_validators(manifest):
+    return {
+        tool["name"]: compile_validator(tool.get("input_schema", {}))
+        for tool in manifest.get("tools", [])
+    }
@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live per entry.
+
+    When a path is given, entries are mirrored to a local SQLite table so
+    the cache survives restarts. Values must be JSON-serializable.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, path=None, table="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self.table = table
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.path = path
+        self._db = None
+        self._pid = os.getpid()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, stored REAL NOT NULL)"
+            )
+            self._load()
+
+    def _load(self):
+        now = time.time()
+        self._db.execute(f"DELETE FROM {self.table} WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        rows = self._db.execute(
+            f"SELECT key, value, expires FROM {self.table} ORDER BY stored DESC LIMIT ?",
+            (self.maxsize,)
+        ).fetchall()
+        for key, value, expires in reversed(rows):
+            self._data[key] = (json.loads(value), expires)
+        self._db.execute(
+            f"DELETE FROM {self.table} WHERE key NOT IN "
+            f"(SELECT key FROM {self.table} ORDER BY stored DESC LIMIT ?)",
+            (self.maxsize,)
+        )
+        self._db.commit()
+
+    def _check_fork(self):
+        # SQLite connections must not be shared with a forked child
+        if self.path and self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._check_fork()
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                self._remove(key)
+                if self._db is not None:
+                    self._db.commit()
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Stores several (key, value) pairs with one SQLite write and commit."""
+        items = list(items)
+        if not items:
+            return
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_fork()
+            for key, value in items:
+                self._data[key] = (value, expires)
+                self._data.move_to_end(key)
+            if self._db is not None:
+                # Items that would be evicted right away are not written; the
+                # stored offsets keep their LRU order for _load
+                kept = items[max(len(items) - self.maxsize, 0):]
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires, stored) VALUES (?, ?, ?, ?)",
+                    [(key, json.dumps(value), expires, now + i * 1e-6) for i, (key, value) in enumerate(kept)]
+                )
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+            if self._db is not None:
+                self._db.commit()
+
+    def _remove(self, key):
+        self._data.pop(key, None)
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._check_fork()
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
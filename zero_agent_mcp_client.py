@@ -2,6 +2,9 @@
 import os
 import json
 import requests
+from mcp_client_core import manifest_cache as shared_manifest_cache
+from tool_validators import ValidationError
+from prompt_builder import prompt_sections
 from langchain_openai import ChatOpenAI
 
 # Set your OpenAI API key
@@ -9,52 +12,37 @@ os.environ["OPENAI_API_KEY"] = "your-api-key-here"
 
 # MCP Client to discover and call tools
 class MCPClient:
-    def __init__(self, base_url="http://localhost:5001"):
+    def __init__(self, base_url="http://localhost:5001", manifest_cache=None):
         self.base_url = base_url
-        self.manifest = self._fetch_manifest()
+        self.manifest_cache = manifest_cache or shared_manifest_cache
 
-    def _fetch_manifest(self):
-        response = requests.get(f"{self.base_url}/manifest")
-        return response.json()
+    @property
+    def manifest(self):
+        return self.manifest_cache.get(self.base_url, default={"tools": []})
+
+    @property
+    def index(self):
+        return self.manifest_cache.index(self.base_url, default={"tools": []})
 
     def get_tool_names(self):
-        return [tool["name"] for tool in self.manifest.get("tools", [])]
+        return self.index.names
 
     def get_tool_info(self, name):
-        for tool in self.manifest.get("tools", []):
-            if tool["name"] == name:
-                return tool
-        return None
+        return self.index.get(name)
 
     def call_tool(self, name, params):
+        try:
+            params = self.index.validate(name, params)
+        except ValidationError as e:
+            return {"status": "error", "message": str(e)}
         response = requests.post(f"{self.base_url}/tools/{name}", json=params)
         return response.json()
 
-# Main logic
-def run():
-    llm = ChatOpenAI(temperature=0, model="gpt-4")
-    client = MCPClient()
-
-    # Describe all available tools to the LLM
-    tool_descriptions = []
-    for tool in client.manifest.get("tools", []):
-        tool_descriptions.append({
-            "name": tool["name"],
-            "description": tool.get("description", ""),
-            "params": tool.get("input_schema", {}).get("properties", {})
-        })
-
-    print("MCP Zero Agent Interface Ready!")
-    print("Ask anything and GPT-4 will decide which tool to use.\n")
-
-    while True:
-        user_input = input("You: ")
-        if user_input.lower() in ("quit", "exit"):
-            break
-
-        system_prompt = f"""
+# Tool section rendered from the manifest via prompt_builder
+def system_prompt_for(sections):
+    return f"""
         You are an assistant with access to the following tools:
-        {json.dumps(tool_descriptions, indent=2)}
+        {sections.tool_json}
 
         Based on the user input, respond ONLY with a JSON object like:
         {{
@@ -68,6 +56,24 @@ def run():
         Do NOT add commentary or explanations. ONLY output the JSON.
         """
 
+# Main logic
+def run():
+    llm = ChatOpenAI(temperature=0, model="gpt-4")
+    client = MCPClient()
+
+    tool_tokens = prompt_sections(client.index).stats()["tool_json_tokens"]
+    print("MCP Zero Agent Interface Ready!")
+    print(f"Tool descriptions use ~{tool_tokens} prompt tokens.")
+    print("Ask anything and GPT-4 will decide which tool to use.\n")
+
+    while True:
+        user_input = input("You: ")
+        if user_input.lower() in ("quit", "exit"):
+            break
+
+        # Rendered once per manifest version, not on every turn
+        system_prompt = prompt_sections(client.index).cached("zero_agent_system", system_prompt_for)
+
         try:
             response = llm.invoke([
                 {"role": "system", "content": system_prompt},